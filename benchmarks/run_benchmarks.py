@@ -0,0 +1,248 @@
+"""
+Benchmark suite for the mortgage engine.
+
+Times scenario expansion, calculate_mortgage (summary and schedule modes),
+the report comparison and export, and an in-process /calculate round trip
+on synthetic configs of 1 to 1M branches. Results (seconds, scenarios/s,
+months/s and peak traced memory) are written as JSON; pass --baseline to
+compare against an earlier run.
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --baseline bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import List, Dict, Any, Callable, Optional
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from mortgage_lib.models import ScenarioConfig, LoanDetails, RateChange, Overpayment, AnalysisSettings
+from mortgage_lib.scenarios import ScenarioSpace, expand_scenarios
+from mortgage_lib.calculation import calculate_mortgage
+from mortgage_lib.reports import differing_months, export_reports
+
+DEFAULT_SIZES = [1, 10, 100, 1000, 10000, 100000, 1000000]
+
+# Most scenarios each benchmark processes; larger configs are benchmarked on
+# an evenly spaced sample of their branches.
+DEFAULT_CAPS = {
+    "expand": 100000,
+    "summary": 10000,
+    "schedule": 2000,
+    "compare": 10000,
+    "export": 200,
+    "api": 1000,
+}
+
+BENCHMARKS = list(DEFAULT_CAPS)
+
+# Slower than baseline by more than this factor counts as a regression
+DEFAULT_THRESHOLD = 1.2
+
+
+def synthetic_config(branches: int) -> ScenarioConfig:
+    """
+    A 25-year loan whose yearly rate changes multiply out to exactly
+    `branches` scenarios (options per change are the prime factors).
+    """
+    factors = []
+    n, p = branches, 2
+    while n > 1:
+        while n % p == 0:
+            factors.append(p)
+            n //= p
+        p += 1
+
+    rate_changes = [
+        RateChange(month=13 + 12 * i, new_rate=[round(2.0 + 0.25 * j + 0.05 * i, 2) for j in range(count)])
+        for i, count in enumerate(factors)
+    ]
+    return ScenarioConfig(
+        analysis_settings=AnalysisSettings(window_start_month=1, window_end_month=24),
+        base_loan=LoanDetails(principal=350000, start_rate=4.5, years=25),
+        rate_changes=rate_changes,
+        overpayments=[Overpayment(month=30, amount=10000)],
+    )
+
+
+def sample(space: ScenarioSpace, cap: int) -> ScenarioSpace:
+    """
+    All of space, or cap evenly spaced scenarios from it.
+    """
+    if len(space) <= cap:
+        return space
+    step = -(-len(space) // cap)
+    return space[::step]
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    Best wall time over `repeat` runs, then one run under tracemalloc for
+    the peak memory (timed separately since tracing slows Python down).
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": best, "peak_mb": peak / 1024 / 1024}
+
+
+def run_benchmark(name: str, config: ScenarioConfig, cap: int, repeat: int) -> Dict[str, Any]:
+    space = ScenarioSpace(config)
+    scenarios = list(sample(space, cap))
+    sampled = len(scenarios) < len(space)
+    # Months simulated per scenario, for months/s (measured outside the timings)
+    months = sum(len(calculate_mortgage(sc, return_schedule=True)["schedule"]) for sc in scenarios) if name != "expand" else 0
+
+    if name == "expand":
+        if sampled:
+            fn = lambda: list(sample(space, cap))
+        else:
+            fn = lambda: expand_scenarios(config)
+    elif name == "summary":
+        fn = lambda: [calculate_mortgage(sc) for sc in scenarios]
+    elif name == "schedule":
+        fn = lambda: [calculate_mortgage(sc, return_schedule=True) for sc in scenarios]
+    elif name == "compare":
+        schedules = [calculate_mortgage(sc, return_schedule=True)["schedule"] for sc in scenarios]
+        fn = lambda: differing_months(schedules)
+    elif name == "export":
+        results = [calculate_mortgage(sc, return_schedule=True) for sc in scenarios]
+
+        def fn():
+            with tempfile.TemporaryDirectory() as output_dir, contextlib.redirect_stdout(io.StringIO()):
+                export_reports(results, output_dir)
+    elif name == "api":
+        from fastapi.testclient import TestClient
+        from api.main import app
+        client = TestClient(app)
+        if sampled:
+            # The API expands the whole config, so send one config per
+            # sampled scenario instead
+            bodies = [
+                {**config.model_dump(), "rate_changes": [rc.model_dump() for rc in sc.rate_changes]}
+                for sc in scenarios
+            ]
+        else:
+            bodies = [config.model_dump()]
+
+        def fn():
+            for body in bodies:
+                response = client.post("/calculate", json=body)
+                response.raise_for_status()
+    else:
+        raise ValueError(f"Unknown benchmark {name!r}")
+
+    timing = measure(fn, repeat)
+    seconds = timing["seconds"]
+    return {
+        "benchmark": name,
+        "branches": len(space),
+        "scenarios": len(scenarios),
+        "sampled": sampled,
+        "seconds": seconds,
+        "scenarios_per_s": len(scenarios) / seconds if seconds else None,
+        "months_per_s": months / seconds if seconds and months else None,
+        "peak_mb": timing["peak_mb"],
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Prints each result's time relative to the baseline run and returns the
+    keys of those slower by more than threshold.
+    """
+    previous = {(r["benchmark"], r["branches"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\n{'Benchmark':<10} {'Branches':>10} {'Baseline s':>12} {'Current s':>12} {'Ratio':>8}")
+    for r in results:
+        key = (r["benchmark"], r["branches"])
+        old = previous.get(key)
+        if old is None or old["scenarios"] != r["scenarios"]:
+            continue
+        ratio = r["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        flag = "  SLOWER" if ratio > threshold else ""
+        print(f"{r['benchmark']:<10} {r['branches']:>10} {old['seconds']:>12.4f} {r['seconds']:>12.4f} {ratio:>8.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(f"{r['benchmark']}@{r['branches']}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mortgage engine benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Branch counts to benchmark")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS, help="Benchmarks to run")
+    parser.add_argument("--cap", type=int, help="Override every benchmark's scenario cap")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark (best is kept)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'Benchmark':<10} {'Branches':>10} {'Scenarios':>10} {'Seconds':>10} {'Scen/s':>12} {'Months/s':>12} {'Peak MB':>9}")
+    for size in args.sizes:
+        config = synthetic_config(size)
+        for name in args.only:
+            r = run_benchmark(name, config, args.cap or DEFAULT_CAPS[name], args.repeat)
+            results.append(r)
+            months_per_s = f"{r['months_per_s']:>12.0f}" if r["months_per_s"] else f"{'-':>12}"
+            scenarios = f"{r['scenarios']}{'*' if r['sampled'] else ''}"
+            print(f"{name:<10} {size:>10} {scenarios:>10} {r['seconds']:>10.4f} {r['scenarios_per_s']:>12.0f} {months_per_s} {r['peak_mb']:>9.1f}")
+    print("(* = evenly spaced sample of the branches)")
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions (> {args.threshold:.2f}x slower): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
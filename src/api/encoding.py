@@ -0,0 +1,167 @@
+"""
+Response bodies for the calculate endpoints, encoded straight to bytes.
+
+JSON goes through orjson when it is installed and the stdlib encoder
+otherwise. Either way FastAPI's jsonable_encoder pass is skipped. Bodies are
+compressed with zstd (if a zstd module is available) or gzip, whichever the
+client's Accept-Encoding prefers. Schedules can be sent as row records
+("json"), one list per column ("columnar"), or as an Arrow IPC stream
+("arrow", needs pyarrow).
+"""
+import gzip
+import json
+from typing import List, Dict, Any, Optional, Sequence
+
+from fastapi.responses import Response
+
+from mortgage_lib.schedule import SCHEDULE_COLUMNS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    try:
+        import zstandard as _zstandard
+    except ImportError:
+        zstd = None
+    else:
+        class zstd:
+            @staticmethod
+            def compress(data: bytes, level: int) -> bytes:
+                return _zstandard.ZstdCompressor(level=level).compress(data)
+
+RESPONSE_FORMATS = ("json", "columnar", "arrow")
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+# Favour speed: schedules compress well even at low levels
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+# Server preference when the client weighs several encodings equally
+_PREFERRED_ENCODINGS = ("zstd", "gzip")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Compact JSON bytes of obj (dicts, lists, numbers, strings and None).
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def available_encodings() -> List[str]:
+    return [name for name in _PREFERRED_ENCODINGS if name != "zstd" or zstd is not None]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    The content coding to use for an Accept-Encoding header value, or None
+    for an uncompressed body.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    candidates = [
+        (weights.get(name, weights.get("*", 0.0)), -rank, name)
+        for rank, name in enumerate(available_encodings())
+    ]
+    q, _, name = max(candidates)
+    return name if q > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstd.compress(body, level=ZSTD_LEVEL)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def encoded_response(body: bytes, media_type: str, accept_encoding: Optional[str]) -> Response:
+    """
+    A Response for an already encoded body, compressed as negotiated.
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= MIN_COMPRESS_BYTES else None
+    if encoding:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def present_result(result: Dict[str, Any], month_from: Optional[int], month_to: Optional[int], every: int, response_format: str = "json") -> Dict[str, Any]:
+    """
+    Trims a result's Schedule (if any) to the requested months and converts
+    it for the response format: row records for "json", column lists for
+    "columnar". For "arrow" it stays a Schedule for arrow_stream.
+    """
+    if "schedule" in result:
+        schedule = result["schedule"].select(month_from, month_to, every)
+        if response_format == "json":
+            schedule = schedule.to_records()
+        elif response_format == "columnar":
+            schedule = schedule.to_columns()
+        result["schedule"] = schedule
+    return result
+
+
+def arrow_stream(results: Sequence[Dict[str, Any]], group_sizes: Optional[Sequence[int]] = None) -> bytes:
+    """
+    Results as an Arrow IPC stream with one record batch of schedule rows per
+    scenario: a "Scenario" column ahead of the schedule columns, plus a
+    "Config" column with the config's position when the results are split
+    into groups of group_sizes. The summary numbers, without schedules, are
+    stored as JSON in the schema metadata under "results" (a list per group
+    when grouped).
+    """
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("Arrow responses need pyarrow: pip install 'mortgage-calc[parquet]'") from e
+
+    fields = [("Scenario", pa.string())]
+    if group_sizes is not None:
+        fields.append(("Config", pa.int64()))
+    fields += [("Month", pa.int64())] + [(name, pa.float64()) for name in SCHEDULE_COLUMNS[1:]]
+
+    summaries = [{k: v for k, v in res.items() if k != "schedule"} for res in results]
+    groups = [0] * len(results)
+    if group_sizes is not None:
+        grouped, start = [], 0
+        for group, size in enumerate(group_sizes):
+            grouped.append(summaries[start:start + size])
+            groups[start:start + size] = [group] * size
+            start += size
+        summaries = grouped
+    schema = pa.schema(fields, metadata={"results": dumps(summaries)})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for res, group in zip(results, groups):
+            schedule = res.get("schedule")
+            if schedule is None or not len(schedule):
+                continue
+            columns = schedule.rounded()
+            arrays = [pa.array([res["name"]] * len(schedule), pa.string())]
+            if group_sizes is not None:
+                arrays.append(pa.array([group] * len(schedule), pa.int64()))
+            arrays += [pa.array(columns[name]) for name in SCHEDULE_COLUMNS]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+    return sink.getvalue().to_pybytes()
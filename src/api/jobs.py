@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+from mortgage_lib.models import ScenarioConfig
+from mortgage_lib.scenarios import ScenarioSpace
+from mortgage_lib.executors import run_scenarios
+from mortgage_lib.cache import get_default_cache
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue or the result store is at its limit."""
+
+
+class JobTooLargeError(Exception):
+    """Raised when a job's results alone would exceed the result store."""
+
+
+class Job:
+    """
+    One submitted sweep. Results are appended in scenario order as chunks
+    finish, so they can be paged through while the job is still running.
+    """
+
+    def __init__(self, config: ScenarioConfig, include_schedule: bool):
+        self.id = uuid.uuid4().hex
+        self.config = config
+        self.include_schedule = include_schedule
+        self.status = QUEUED
+        self.total = len(ScenarioSpace(config))
+        # Rows the finished job may hold: one per result plus, with
+        # schedules, one per month of the loan term
+        self.reserved_rows = self.total * (1 + config.base_loan.years * 12 if include_schedule else 1)
+        self.stored_rows = 0
+        self.done = 0
+        self.results: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.cancel_requested = threading.Event()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    In-process job store and bounded worker pool.
+    At most max_workers jobs run at once and at most max_queued jobs may be
+    queued or running; finished jobs are dropped ttl_seconds after they end.
+    Results held by all jobs are capped at max_stored_rows (a summary is one
+    row, a schedule one row per month): active jobs count at their reserved
+    size, finished ones at what they actually stored.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queued: int = 100, ttl_seconds: float = 3600, chunk_size: int = 256, max_stored_rows: int = 2_000_000):
+        self.max_queued = max_queued
+        self.max_stored_rows = max_stored_rows
+        self.ttl_seconds = ttl_seconds
+        self.chunk_size = chunk_size
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mortgage-job")
+
+    def submit(self, config: ScenarioConfig, include_schedule: bool = False) -> Job:
+        self.expire()
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job.status in ACTIVE_STATUSES)
+            if active >= self.max_queued:
+                raise QueueFullError(f"Job queue is full ({self.max_queued} jobs queued or running)")
+            job = Job(config, include_schedule)
+            if job.reserved_rows > self.max_stored_rows:
+                raise JobTooLargeError(
+                    f"Job would store up to {job.reserved_rows:,} result rows; the limit is {self.max_stored_rows:,}"
+                    + (" (try include_schedule=false)" if include_schedule else "")
+                )
+            held = sum(
+                j.reserved_rows if j.status in ACTIVE_STATUSES else j.stored_rows
+                for j in self._jobs.values()
+            )
+            if held + job.reserved_rows > self.max_stored_rows:
+                raise QueueFullError(f"Result store is full ({held:,} of {self.max_stored_rows:,} rows held by other jobs)")
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.expire()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Requests cancellation; a running job stops after its current chunk.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_requested.set()
+        with self._lock:
+            if job.status == QUEUED:
+                job.status = CANCELLED
+                job.finished_at = time.time()
+        return job
+
+    def expire(self):
+        """
+        Drops finished jobs older than the TTL.
+        """
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished_at is not None and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def _run(self, job: Job):
+        with self._lock:
+            if job.status != QUEUED:
+                return
+            job.status = RUNNING
+
+        try:
+            scenarios = ScenarioSpace(job.config)
+            cache = get_default_cache()
+            for start in range(0, len(scenarios), self.chunk_size):
+                if job.cancel_requested.is_set():
+                    break
+                chunk = scenarios[start:start + self.chunk_size]
+                for res in run_scenarios(chunk, return_schedule=job.include_schedule, cache=cache):
+                    job.stored_rows += 1
+                    if "schedule" in res:
+                        res["schedule"] = res["schedule"].to_records()
+                        job.stored_rows += len(res["schedule"])
+                    job.results.append(res)
+                job.done = len(job.results)
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        else:
+            job.status = CANCELLED if job.cancel_requested.is_set() else COMPLETED
+        job.finished_at = time.time()
+
+
+def manager_from_env() -> JobManager:
+    """
+    Builds the API's job manager from MORTGAGE_JOB_WORKERS,
+    MORTGAGE_JOB_MAX_QUEUED, MORTGAGE_JOB_TTL_SECONDS and
+    MORTGAGE_JOB_MAX_STORED_ROWS.
+    """
+    return JobManager(
+        max_workers=int(os.environ.get("MORTGAGE_JOB_WORKERS", "2")),
+        max_queued=int(os.environ.get("MORTGAGE_JOB_MAX_QUEUED", "100")),
+        ttl_seconds=float(os.environ.get("MORTGAGE_JOB_TTL_SECONDS", "3600")),
+        max_stored_rows=int(os.environ.get("MORTGAGE_JOB_MAX_STORED_ROWS", "2000000")),
+    )
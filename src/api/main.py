@@ -1,38 +1,242 @@
-from fastapi import FastAPI
-from typing import List, Any
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse, PlainTextResponse
+from typing import List, Dict, Any, Iterator, Optional
 import sys
 import os
 
 # Add the src directory to sys.path so we can import mortgage_lib
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
 
-from mortgage_lib.models import ScenarioConfig
-from mortgage_lib.scenarios import expand_scenarios
-from mortgage_lib.calculation import calculate_mortgage
+from mortgage_lib.models import ScenarioConfig, OverpaymentOptimization, MonteCarloRequest
+from mortgage_lib.scenarios import ScenarioSpace, MultiScenarioSpace
+from mortgage_lib.executors import run_scenarios
+from mortgage_lib.batch import LIFETIME_MODES
+from mortgage_lib.cache import get_default_cache
+from mortgage_lib.optimizer import optimize_overpayments
+from mortgage_lib.montecarlo import run_monte_carlo
+from mortgage_lib.metrics import metrics
+from api.jobs import Job, QueueFullError, JobTooLargeError, manager_from_env
+from api.encoding import RESPONSE_FORMATS, ARROW_MEDIA_TYPE, dumps, present_result, arrow_stream, encoded_response
 
 app = FastAPI(title="Mortgage Calculator API")
+jobs = manager_from_env()
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/cache/stats")
+def cache_stats():
+    """
+    Hit/miss/eviction counters of the shared result cache.
+    """
+    return get_default_cache().stats()
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    """
+    Records whole-request time (including body validation) when metrics are on.
+    """
+    with metrics.timed("request"):
+        return await call_next(request)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """
+    Counters and per-stage duration histograms in the Prometheus text
+    format. Recording is enabled with MORTGAGE_METRICS=1.
+    """
+    cache = get_default_cache().stats()
+    return PlainTextResponse(
+        metrics.render_prometheus({"cache_entries": cache["entries"], "cache_bytes": cache["bytes"]}),
+        media_type="text/plain; version=0.0.4",
+    )
+
+# Scenarios simulated per step of a streamed response
+STREAM_CHUNK_SIZE = 64
+
+def stream_results(scenarios: ScenarioSpace, include_schedule: bool, month_from: Optional[int], month_to: Optional[int], every: int, lifetime: str = "full", response_format: str = "json") -> Iterator[bytes]:
+    """
+    Yields one NDJSON line per scenario, simulating a small chunk at a time
+    so memory stays flat however many scenarios there are.
+    """
+    cache = get_default_cache()
+    for start in range(0, len(scenarios), STREAM_CHUNK_SIZE):
+        chunk = scenarios[start:start + STREAM_CHUNK_SIZE]
+        for res in run_scenarios(chunk, return_schedule=include_schedule, cache=cache, lifetime=lifetime):
+            with metrics.timed("serialization"):
+                line = dumps(present_result(res, month_from, month_to, every, response_format)) + b"\n"
+            yield line
+
+def check_options(include_schedule: bool, lifetime: str, response_format: str):
+    if lifetime not in LIFETIME_MODES:
+        raise HTTPException(status_code=422, detail=f"lifetime must be one of {', '.join(LIFETIME_MODES)}")
+    if include_schedule and lifetime != "full":
+        raise HTTPException(status_code=422, detail="include_schedule needs lifetime=full")
+    if response_format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {', '.join(RESPONSE_FORMATS)}")
+
+def render(results: List[Dict[str, Any]], response_format: str, request: Request, group_sizes: Optional[List[int]] = None) -> Response:
+    """
+    Encodes presented results (split into groups of group_sizes, for the
+    batch endpoint) in the response format.
+    """
+    if response_format == "arrow":
+        return encoded_response(arrow_stream(results, group_sizes), ARROW_MEDIA_TYPE, request.headers.get("accept-encoding"))
+    if group_sizes is not None:
+        offsets = [0]
+        for size in group_sizes:
+            offsets.append(offsets[-1] + size)
+        results = [results[start:stop] for start, stop in zip(offsets, offsets[1:])]
+    return encoded_response(dumps(results), "application/json", request.headers.get("accept-encoding"))
+
+FORMAT_DESCRIPTION = "Schedule encoding: row records ('json'), one list per column ('columnar') or an Arrow IPC stream ('arrow')"
+
 @app.post("/calculate")
-def calculate(config: ScenarioConfig) -> List[Any]:
+def calculate(
+    request: Request,
+    config: ScenarioConfig,
+    include_schedule: bool = Query(True, description="Include the monthly schedule of each scenario"),
+    month_from: Optional[int] = Query(None, ge=1, description="First schedule month to return"),
+    month_to: Optional[int] = Query(None, ge=1, description="Last schedule month to return"),
+    every: int = Query(1, ge=1, description="Return every Nth schedule month"),
+    stream: bool = Query(False, description="Stream one NDJSON line per scenario as it finishes"),
+    lifetime: str = Query("full", description="lifetime_interest from a full run ('full'), in closed form after the analysis window ('analytic'), or not at all ('skip', null)"),
+    response_format: str = Query("json", alias="format", description=FORMAT_DESCRIPTION),
+) -> List[Any]:
     """
     Calculates mortgage scenarios based on the provided configuration.
+    Scenarios are simulated on the shared executor pool configured through
+    MORTGAGE_EXECUTOR / MORTGAGE_WORKERS. The body is encoded directly to
+    bytes and compressed as negotiated through Accept-Encoding.
+    """
+    check_options(include_schedule, lifetime, response_format)
+    if stream and response_format == "arrow":
+        raise HTTPException(status_code=422, detail="stream=true returns NDJSON; use format=json or columnar")
+    scenarios = ScenarioSpace(config)
+
+    if stream:
+        return StreamingResponse(
+            stream_results(scenarios, include_schedule, month_from, month_to, every, lifetime, response_format),
+            media_type="application/x-ndjson",
+        )
+
+    results = run_scenarios(scenarios, return_schedule=include_schedule, cache=get_default_cache(), lifetime=lifetime)
+    with metrics.timed("serialization"):
+        presented = [present_result(res, month_from, month_to, every, response_format) for res in results]
+        return render(presented, response_format, request)
+
+def batch_scenario_limit() -> int:
+    """
+    Most scenarios (summed over all configs) one /calculate/batch request
+    may expand to, from MORTGAGE_BATCH_MAX_SCENARIOS.
+    """
+    return int(os.environ.get("MORTGAGE_BATCH_MAX_SCENARIOS", "10000"))
+
+@app.post("/calculate/batch")
+def calculate_batch(
+    request: Request,
+    configs: List[ScenarioConfig],
+    include_schedule: bool = Query(False, description="Include the monthly schedule of each scenario"),
+    month_from: Optional[int] = Query(None, ge=1, description="First schedule month to return"),
+    month_to: Optional[int] = Query(None, ge=1, description="Last schedule month to return"),
+    every: int = Query(1, ge=1, description="Return every Nth schedule month"),
+    lifetime: str = Query("full", description="As for /calculate"),
+    response_format: str = Query("json", alias="format", description=FORMAT_DESCRIPTION),
+) -> List[Any]:
+    """
+    Calculates many configs in one request: their scenarios are pooled
+    into shared batch-engine chunks, and the results come back as one list
+    per config, in request order. The total number of scenarios is capped
+    by MORTGAGE_BATCH_MAX_SCENARIOS (413 above it).
+    """
+    check_options(include_schedule, lifetime, response_format)
+
+    scenarios = MultiScenarioSpace([ScenarioSpace(config) for config in configs])
+    limit = batch_scenario_limit()
+    if len(scenarios) > limit:
+        raise HTTPException(status_code=413, detail=f"Request expands to {len(scenarios)} scenarios; the limit is {limit}")
+
+    results = run_scenarios(scenarios, return_schedule=include_schedule, cache=get_default_cache(), lifetime=lifetime)
+    with metrics.timed("serialization"):
+        presented = [present_result(res, month_from, month_to, every, response_format) for res in results]
+        return render(presented, response_format, request, scenarios.group_sizes())
+
+@app.post("/optimize/overpayments")
+def optimize(request: OverpaymentOptimization) -> List[Any]:
+    """
+    For each scenario of the config, finds the overpayment months that
+    minimise the chosen metric within an annual overpayment budget.
+    """
+    try:
+        return [
+            optimize_overpayments(scenario, request.annual_budget, metric=request.metric, years=request.years)
+            for scenario in ScenarioSpace(request.config).iter_compact()
+        ]
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.post("/montecarlo")
+def monte_carlo(request: MonteCarloRequest) -> Dict[str, Any]:
+    """
+    Simulates the config's loan under stochastic rate paths and returns
+    percentile bands of window interest, lifetime interest and balance.
+    The config's rate_changes are replaced by the simulated rate resets.
+    """
+    return run_monte_carlo(request.config, request.settings)
+
+def _get_job(job_id: str) -> Job:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found (or expired)")
+    return job
+
+@app.post("/jobs", status_code=202)
+def submit_job(
+    config: ScenarioConfig,
+    include_schedule: bool = Query(False, description="Include the monthly schedule of each scenario"),
+):
+    """
+    Queues a scenario sweep to run in the background and returns its ID.
+    """
+    try:
+        job = jobs.submit(config, include_schedule=include_schedule)
+    except JobTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return job.summary()
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    """
+    Progress of a job: status plus scenarios done / total.
+    """
+    return _get_job(job_id).summary()
+
+@app.get("/jobs/{job_id}/results")
+def job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=10000),
+):
+    """
+    One page of a job's results. Pages can be fetched while the job is
+    still running; they cover the scenarios finished so far.
+    """
+    job = _get_job(job_id)
+    page = job.results[offset:offset + limit]
+    return {**job.summary(), "offset": offset, "limit": limit, "results": page}
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """
+    Cancels a job; a running job stops after the chunk it is working on.
     """
-    expanded_scenarios = expand_scenarios(config)
-    results = []
-    
-    # We might want to avoid returning the full schedule in the API if it's too big, 
-    # but for now I'll include it or maybe make it optional in the query params?
-    # The user didn't specify, so I'll include it.
-    
-    for scenario in expanded_scenarios:
-        res = calculate_mortgage(scenario, return_schedule=True)
-        results.append(res)
-        
-    return results
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found (or expired)")
+    return job.summary()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,460 @@
+import numpy as np
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+from .models import SingleScenario
+from .compact import CompactScenario, compact
+from .schedule import Schedule, SCHEDULE_COLUMNS
+from .metrics import metrics
+
+# month -> (row indices, values); at most one entry per row and month
+EventMap = Dict[int, Tuple[np.ndarray, np.ndarray]]
+
+# How lifetime_interest is produced: by simulating to payoff, in closed form
+# from the state at the end of the analysis window, or not at all (None)
+LIFETIME_MODES = ("full", "analytic", "skip")
+
+# Per-month sums over all running loans (record_totals)
+TOTAL_COLUMNS = ["Month", "Loans Active", "Monthly Payment", "Interest Paid", "Principal Paid", "Overpayment", "End Balance"]
+
+
+def annuity_payments(balance: np.ndarray, annual_rate: np.ndarray, years: np.ndarray) -> np.ndarray:
+    """
+    Vectorised calculate_monthly_payment.
+    Formula: M = P [ i(1 + i)^n ] / [ (1 + i)^n – 1 ]
+    """
+    monthly_rate = annual_rate / 100 / 12
+    num_payments = years * 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.power(1 + monthly_rate, num_payments)
+        payment = balance * (monthly_rate * growth) / (growth - 1)
+        payment = np.where(num_payments <= 0, balance, payment)
+        payment = np.where(annual_rate == 0, balance / num_payments, payment)
+    return payment
+
+
+def build_event_map(per_row_events: Sequence[Dict[int, float]]) -> EventMap:
+    """
+    Turns one {month: value} dict per row into per-month index/value arrays.
+    """
+    rows_by_month: Dict[int, List[int]] = {}
+    values_by_month: Dict[int, List[float]] = {}
+    for row, events in enumerate(per_row_events):
+        for month, value in events.items():
+            rows_by_month.setdefault(month, []).append(row)
+            values_by_month.setdefault(month, []).append(value)
+
+    return {
+        month: (np.array(rows, dtype=np.intp), np.array(values_by_month[month], dtype=float))
+        for month, rows in rows_by_month.items()
+    }
+
+
+def simulate_batch(
+    principal: np.ndarray,
+    start_rate: np.ndarray,
+    years: np.ndarray,
+    window_start: np.ndarray,
+    window_end: np.ndarray,
+    rate_events: EventMap,
+    overpayment_events: EventMap,
+    return_schedule: bool = False,
+    record_balance: bool = False,
+    record_totals: bool = False,
+    stop_month: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Advances every loan in lockstep, one month per iteration, applying the
+    same amortisation rules as calculate_mortgage to whole arrays at once.
+
+    Returns the summary arrays (one entry per loan). With return_schedule,
+    also returns a (months x loans) matrix per schedule column and the
+    number of schedule rows recorded for each loan. With record_balance,
+    returns just the (months x loans) end-of-month balance matrix, which
+    holds each loan's final balance after it stops. With record_totals,
+    returns "monthly_totals": per month, the number of loans still running
+    and the sums of their schedule rows' flow columns and end balance,
+    plus "months_active" (each loan's number of schedule rows).
+
+    With stop_month, months from stop_month on are not simulated; loans
+    still running are returned as "state" (their month, balance, rate,
+    payment and running mask) for finish_lifetime to complete.
+    """
+    n = len(principal)
+    total_months = years * 12
+    max_months = int(total_months.max() * 2) if n else 0
+
+    balance = principal.astype(float).copy()
+    rate = start_rate.astype(float).copy()
+    payment = annuity_payments(balance, rate, years.astype(float))
+
+    total_interest = np.zeros(n)
+    window_interest = np.zeros(n)
+    window_principal = np.zeros(n)
+    balance_at_window_end = np.zeros(n)
+
+    active = balance > 0.01
+    # The month counter each loan's loop stopped on (see calculate_mortgage)
+    end_month = np.ones(n, dtype=np.int64)
+    rows_recorded = np.zeros(n, dtype=np.int64)
+
+    columns: Dict[str, List[np.ndarray]] = {c: [] for c in SCHEDULE_COLUMNS}
+    end_balances: List[np.ndarray] = []
+    totals: Dict[str, List[Any]] = {c: [] for c in TOTAL_COLUMNS}
+    cumulative_interest = np.zeros(n)
+    cumulative_principal = np.zeros(n)
+    cumulative_total_paid = np.zeros(n)
+
+    no_overpayment = np.zeros(n)
+
+    last_month = max_months if stop_month is None else min(max_months, stop_month - 1)
+    for month in range(1, last_month + 1):
+        if not active.any():
+            break
+
+        start_balance = balance
+
+        if month in rate_events:
+            rows, values = rate_events[month]
+            live = active[rows]
+            rows, values = rows[live], values[live]
+            rate[rows] = values
+            remaining_term_months = total_months[rows] - (month - 1)
+            payment[rows] = np.where(
+                remaining_term_months <= 0,
+                balance[rows],  # Force pay off
+                annuity_payments(balance[rows], values, remaining_term_months / 12),
+            )
+
+        monthly_interest_rate = rate / 100 / 12
+        interest_payment = np.where(active, balance * monthly_interest_rate, 0.0)
+        total_interest += interest_payment
+
+        overpayment_amount = no_overpayment
+        if month in overpayment_events:
+            rows, values = overpayment_events[month]
+            live = active[rows]
+            overpayment_amount = np.zeros(n)
+            overpayment_amount[rows[live]] = values[live]
+            balance = balance - overpayment_amount
+
+        paying = active & (balance > 0)
+        principal_component = np.where(paying, payment - interest_payment, 0.0)
+        amount_to_pay = payment
+        settles = paying & (balance < principal_component)
+        if settles.any():
+            amount_to_pay = np.where(settles, balance + interest_payment, amount_to_pay)
+            principal_component = np.where(settles, balance, principal_component)
+        balance = np.where(paying, balance - principal_component, balance)
+
+        principal_paid = principal_component + overpayment_amount
+
+        if return_schedule or record_totals:
+            rows_recorded += active
+
+        if return_schedule:
+            cumulative_interest += interest_payment
+            cumulative_principal += np.where(active, principal_paid, 0.0)
+            cumulative_total_paid += np.where(active, amount_to_pay + overpayment_amount, 0.0)
+
+            columns["Month"].append(month)
+            columns["Rate (%)"].append(rate.copy())
+            columns["Start Balance"].append(start_balance)
+            columns["Monthly Payment"].append(np.array(amount_to_pay))
+            columns["Interest Paid"].append(interest_payment)
+            columns["Principal Paid"].append(principal_paid)
+            columns["Overpayment"].append(overpayment_amount)
+            columns["End Balance"].append(np.maximum(0, balance))
+            columns["Cumulative Interest"].append(cumulative_interest.copy())
+            columns["Cumulative Principal"].append(cumulative_principal.copy())
+            columns["Total Paid To Date"].append(cumulative_total_paid.copy())
+
+        if record_balance:
+            end_balances.append(np.maximum(0, balance))
+
+        if record_totals:
+            totals["Month"].append(month)
+            totals["Loans Active"].append(int(active.sum()))
+            totals["Monthly Payment"].append(float(amount_to_pay[active].sum()))
+            totals["Interest Paid"].append(float(interest_payment.sum()))
+            totals["Principal Paid"].append(float(principal_paid[active].sum()))
+            totals["Overpayment"].append(float(overpayment_amount.sum()))
+            totals["End Balance"].append(float(np.maximum(0, balance[active]).sum()))
+
+        in_window = active & (window_start <= month) & (month <= window_end)
+        window_interest += np.where(in_window, interest_payment, 0.0)
+        window_principal += np.where(in_window, principal_paid, 0.0)
+        balance_at_window_end = np.where(in_window & (month == window_end), balance, balance_at_window_end)
+
+        paid_off = active & (balance <= 0.001)
+        end_month[paid_off] = month
+        active &= ~paid_off
+
+        # Loops that fall out through the while condition or the term cap
+        # stop with the counter already advanced.
+        stopped = active & ((balance <= 0.01) | (month + 1 > total_months * 2))
+        end_month[stopped] = month + 1
+        active &= ~stopped
+
+    stopped_early = stop_month is not None and active.any()
+    if stopped_early:
+        end_month[active] = stop_month
+    balance_at_window_end = np.where(end_month <= window_end, 0.0, balance_at_window_end)
+
+    result = {
+        "window_interest": window_interest,
+        "window_principal": window_principal,
+        "balance_at_window_end": balance_at_window_end,
+        "lifetime_interest": total_interest,
+        "end_month": end_month,
+    }
+
+    if return_schedule:
+        result["schedule_columns"] = {
+            name: (np.array(values, dtype=np.int64) if name == "Month" else np.vstack(values) if values else np.empty((0, n)))
+            for name, values in columns.items()
+        }
+        result["schedule_rows"] = rows_recorded
+
+    if stop_month is not None:
+        result["state"] = {
+            "month": stop_month,
+            "balance": balance,
+            "rate": rate,
+            "payment": payment,
+            "active": active,
+        }
+
+    if record_totals:
+        result["monthly_totals"] = {
+            name: np.array(values, dtype=np.int64 if name in ("Month", "Loans Active") else float)
+            for name, values in totals.items()
+        }
+        result["months_active"] = rows_recorded
+
+    if record_balance:
+        result["end_balance"] = np.vstack(end_balances) if end_balances else np.empty((0, n))
+
+    return result
+
+
+def _months_to_settle(balance: np.ndarray, monthly_rate: np.ndarray, payment: np.ndarray) -> np.ndarray:
+    """
+    Full payments made before the settling month, i.e. the first k with
+    B(k)(1 + i) < P, where simulate_batch pays off the rest. inf when the
+    payment does not cover the interest.
+    """
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        growth_needed = (payment / monthly_rate - payment / (1 + monthly_rate)) / (payment / monthly_rate - balance)
+        k = np.ceil(np.log(growth_needed) / np.log1p(monthly_rate))
+        k = np.where(monthly_rate == 0, np.floor(balance / payment), k)
+        k = np.where(payment <= balance * monthly_rate, np.inf, k)
+        k = np.where(balance * (1 + monthly_rate) < payment, 0, k)
+        # Rounding in the log can be one month off either way
+        k = np.where((k > 0) & np.isfinite(k) & (_balance_after(balance, monthly_rate, payment, k - 1) * (1 + monthly_rate) < payment), k - 1, k)
+        k = np.where(np.isfinite(k) & (_balance_after(balance, monthly_rate, payment, k) * (1 + monthly_rate) >= payment), k + 1, k)
+    return np.maximum(k, 0)
+
+
+def _balance_after(balance: np.ndarray, monthly_rate: np.ndarray, payment: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """
+    Annuity recurrence B(k) = B(1 + i)^k - P((1 + i)^k - 1) / i.
+    """
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        growth = np.power(1 + monthly_rate, months)
+        after = balance * growth - payment * (growth - 1) / monthly_rate
+    return np.where(monthly_rate == 0, balance - months * payment, after)
+
+
+def finish_lifetime(
+    state: Dict[str, Any],
+    years: np.ndarray,
+    rate_events: EventMap,
+    overpayment_events: EventMap,
+) -> np.ndarray:
+    """
+    Interest still to be paid by the loans left running by a stop_month run
+    of simulate_batch. Stretches without events are evaluated with the
+    annuity recurrence (payoff month included) and event months are stepped
+    with simulate_batch's rules, so the cost grows with the number of
+    events, not with the remaining term. Matches a full run to within a cent.
+    """
+    month = state["month"]
+    balance = state["balance"].copy()
+    rate = state["rate"].copy()
+    payment = state["payment"].copy()
+    active = state["active"].copy()
+    total_months = years * 12
+    cap = total_months * 2
+    remaining_interest = np.zeros(len(balance))
+
+    events = sorted(m for m in rate_events.keys() | overpayment_events.keys() if m >= month)
+    for boundary in events + [None]:
+        if not active.any():
+            break
+
+        # Months month..boundary-1 have no events
+        span = cap - month + 1
+        if boundary is not None:
+            span = np.minimum(span, boundary - month)
+        span = np.where(active, np.maximum(span, 0), 0).astype(float)
+        monthly_rate = rate / 100 / 12
+        settle = _months_to_settle(balance, monthly_rate, payment)
+
+        settles = active & (settle < span)
+        jump = np.where(settles, settle, span)
+        end_balance = _balance_after(balance, monthly_rate, payment, jump)
+        paid = np.where(active, jump * payment - (balance - end_balance), 0.0)
+        # The settling month pays the interest on what is left
+        final = np.where(settles & (end_balance > 0.01), end_balance * monthly_rate, 0.0)
+        remaining_interest += paid + final
+
+        balance = np.where(settles, 0.0, np.where(active, end_balance, balance))
+        active &= ~settles
+        active &= ~(month + span > cap)
+        if boundary is None or not active.any():
+            break
+
+        month = boundary
+        active &= month <= cap
+        if month in rate_events:
+            rows, values = rate_events[month]
+            live = active[rows]
+            rows, values = rows[live], values[live]
+            rate[rows] = values
+            remaining_term_months = total_months[rows] - (month - 1)
+            payment[rows] = np.where(
+                remaining_term_months <= 0,
+                balance[rows],
+                annuity_payments(balance[rows], values, remaining_term_months / 12),
+            )
+
+        interest_payment = np.where(active, balance * rate / 100 / 12, 0.0)
+        remaining_interest += interest_payment
+        if month in overpayment_events:
+            rows, values = overpayment_events[month]
+            live = active[rows]
+            balance = balance.copy()
+            balance[rows[live]] -= values[live]
+
+        paying = active & (balance > 0)
+        principal_component = np.where(paying, payment - interest_payment, 0.0)
+        principal_component = np.where(paying & (balance < principal_component), balance, principal_component)
+        balance = np.where(paying, balance - principal_component, balance)
+
+        active &= ~(balance <= 0.001)
+        active &= ~((balance <= 0.01) | (month + 1 > cap))
+        month += 1
+
+    return remaining_interest
+
+
+def batch_inputs(scenarios: Sequence[Union[SingleScenario, CompactScenario]]) -> Dict[str, Any]:
+    """
+    The per-loan arrays and event maps run_batch takes, from a list of
+    scenarios. ScenarioSpace.batch_inputs builds the same thing for a slice
+    of a config without creating any scenario objects.
+    """
+    scenarios = [compact(s) for s in scenarios]
+    return {
+        "names": [s.name for s in scenarios],
+        "principal": np.array([s.principal for s in scenarios], dtype=float),
+        "start_rate": np.array([s.start_rate for s in scenarios], dtype=float),
+        "years": np.array([s.years for s in scenarios], dtype=np.int64),
+        "window_start": np.array([s.window_start for s in scenarios], dtype=np.int64),
+        "window_end": np.array([s.window_end for s in scenarios], dtype=np.int64),
+        "rate_events": build_event_map([s.rates for s in scenarios]),
+        "overpayment_events": build_event_map([s.overpayments for s in scenarios]),
+    }
+
+
+def take_inputs(inputs: Dict[str, Any], rows: Sequence[int]) -> Dict[str, Any]:
+    """
+    The batch_inputs entries of the given rows only, renumbered in that order.
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    position = np.full(len(inputs["names"]), -1, dtype=np.intp)
+    position[rows] = np.arange(len(rows))
+    taken: Dict[str, Any] = {"names": [inputs["names"][i] for i in rows]}
+    for key in ("principal", "start_rate", "years", "window_start", "window_end"):
+        taken[key] = inputs[key][rows]
+    for key in ("rate_events", "overpayment_events"):
+        events: EventMap = {}
+        for month, (event_rows, values) in inputs[key].items():
+            new_rows = position[event_rows]
+            keep = new_rows >= 0
+            if keep.any():
+                events[month] = (new_rows[keep], values[keep])
+        taken[key] = events
+    return taken
+
+
+def run_batch(inputs: Dict[str, Any], return_schedule: bool = False, lifetime: str = "full") -> List[Dict[str, Any]]:
+    """
+    Simulates batch_inputs output; see calculate_mortgage_batch.
+    """
+    if lifetime not in LIFETIME_MODES:
+        raise ValueError(f"lifetime must be one of {', '.join(LIFETIME_MODES)}, got {lifetime!r}")
+    if return_schedule and lifetime != "full":
+        raise ValueError("Schedules need lifetime='full'")
+    names = inputs["names"]
+    if not names:
+        return []
+
+    years = inputs["years"]
+    rate_events = inputs["rate_events"]
+    overpayment_events = inputs["overpayment_events"]
+    stop_month = None if lifetime == "full" else int(inputs["window_end"].max()) + 1
+
+    with metrics.timed("simulation"):
+        raw = simulate_batch(
+            inputs["principal"], inputs["start_rate"], years, inputs["window_start"], inputs["window_end"],
+            rate_events, overpayment_events, return_schedule=return_schedule,
+            stop_month=stop_month,
+        )
+        if lifetime == "analytic":
+            raw["lifetime_interest"] = raw["lifetime_interest"] + finish_lifetime(raw["state"], years, rate_events, overpayment_events)
+    metrics.inc("scenarios_simulated", len(names))
+    metrics.inc("months_simulated", int(raw["end_month"].sum()))
+
+    window_interest = raw["window_interest"].tolist()
+    window_principal = raw["window_principal"].tolist()
+    balance_at_window_end = raw["balance_at_window_end"].tolist()
+    lifetime_interest = [None] * len(names) if lifetime == "skip" else raw["lifetime_interest"].tolist()
+
+    results = []
+    for i, name in enumerate(names):
+        result = {
+            "name": name,
+            "window_interest": window_interest[i],
+            "window_principal": window_principal[i],
+            "balance_at_window_end": balance_at_window_end[i],
+            "lifetime_interest": lifetime_interest[i],
+        }
+        if return_schedule:
+            result["schedule"] = _schedule_for(raw["schedule_columns"], i, int(raw["schedule_rows"][i]))
+        results.append(result)
+
+    return results
+
+
+def calculate_mortgage_batch(scenarios: Sequence[Union[SingleScenario, CompactScenario]], return_schedule: bool = False, lifetime: str = "full") -> List[Dict[str, Any]]:
+    """
+    Simulates many scenarios at once with NumPy.
+    Returns one result dict per scenario, in input order, shaped exactly
+    like the output of calculate_mortgage.
+
+    With lifetime="analytic" or "skip", loans are only simulated month by
+    month up to the latest analysis window end; lifetime_interest is then
+    completed by finish_lifetime or left as None. Window metrics are exact
+    either way. Schedules need the full run.
+    """
+    return run_batch(batch_inputs(scenarios), return_schedule=return_schedule, lifetime=lifetime)
+
+
+def _schedule_for(columns: Dict[str, np.ndarray], index: int, num_rows: int) -> Schedule:
+    """
+    Cuts one scenario's rows out of the batch matrices.
+    """
+    return Schedule({
+        name: values[:num_rows].copy() if name == "Month" else values[:num_rows, index].copy()
+        for name, values in columns.items()
+    })
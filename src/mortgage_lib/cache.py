@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Union
+from .models import SingleScenario
+from .compact import CompactScenario, compact
+from .calculation import calculate_mortgage
+from .metrics import metrics
+
+# Rough footprint of a summary-only entry (dict + four floats + key)
+SUMMARY_ENTRY_BYTES = 512
+
+
+def scenario_key(scenario: Union[SingleScenario, CompactScenario]) -> str:
+    """
+    Canonical hash of everything that affects a scenario's numbers.
+    The name is ignored, and rate changes / overpayments are reduced to the
+    month -> value lookups calculate_mortgage actually uses, so scenarios
+    that differ only in naming or event ordering share a key.
+    """
+    scenario = compact(scenario)
+    payload = {
+        "loan": [scenario.principal, scenario.start_rate, scenario.years],
+        "window": [scenario.window_start, scenario.window_end],
+        "rates": sorted(scenario.rates.items()),
+        "overpayments": sorted(scenario.overpayments.items()),
+    }
+    encoded = json.dumps(payload, separators=(",", ":")).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _entry_size(result: Dict[str, Any]) -> int:
+    schedule = result.get("schedule")
+    return SUMMARY_ENTRY_BYTES + (schedule.nbytes if schedule is not None else 0)
+
+
+class ResultCache:
+    """
+    LRU cache of calculate_mortgage results keyed on scenario_key.
+    Summary-only and with-schedule results are separate entries. Memory use
+    is bounded by max_bytes (schedules count at their array size); the least
+    recently used entries are evicted first. With a path, entries are also
+    written to an SQLite file so a warm cache survives restarts.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self._entries: "OrderedDict[Tuple[str, bool], Dict[str, Any]]" = OrderedDict()
+        self._sizes: Dict[Tuple[str, bool], int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, scenario: Union[SingleScenario, CompactScenario], with_schedule: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Returns a copy of the cached result renamed to scenario.name, or None.
+        """
+        key = (scenario_key(scenario), with_schedule)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute(
+                    "SELECT value FROM results WHERE key = ?", (self._disk_key(key),)
+                ).fetchone()
+                if row is not None:
+                    result = pickle.loads(row[0])
+                    self.disk_hits += 1
+                    self._store(key, result)
+
+            if result is None:
+                self.misses += 1
+                metrics.inc("cache_misses")
+                return None
+            self.hits += 1
+            metrics.inc("cache_hits")
+
+        cached = dict(result)
+        cached["name"] = scenario.name
+        return cached
+
+    def put(self, scenario: Union[SingleScenario, CompactScenario], result: Dict[str, Any], with_schedule: bool = False):
+        """
+        Stores a result for scenario. The schedule (if any) is shared with
+        later hits, so it should not be modified afterwards.
+        """
+        key = (scenario_key(scenario), with_schedule)
+        # The name slot stays (get fills it in), so hits keep the key order of misses
+        stored = {k: (None if k == "name" else v) for k, v in result.items()}
+        with self._lock:
+            self._store(key, stored)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)",
+                    (self._disk_key(key), pickle.dumps(stored, protocol=pickle.HIGHEST_PROTOCOL)),
+                )
+                self._db.commit()
+
+    def clear(self):
+        """
+        Empties the in-memory entries (the on-disk store is kept).
+        """
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_hits": self.disk_hits,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _store(self, key: Tuple[str, bool], result: Dict[str, Any]):
+        if key in self._entries:
+            self._bytes -= self._sizes[key]
+        size = _entry_size(result)
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        self._sizes[key] = size
+        self._bytes += size
+
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            old_key, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(old_key)
+            self.evictions += 1
+
+    @staticmethod
+    def _disk_key(key: Tuple[str, bool]) -> str:
+        digest, with_schedule = key
+        return f"{digest}:{'schedule' if with_schedule else 'summary'}"
+
+
+_default_cache: Optional[ResultCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> ResultCache:
+    """
+    The process-wide cache, configured on first use from
+    MORTGAGE_CACHE_MAX_MB (default 256) and MORTGAGE_CACHE_PATH (an SQLite
+    file for the optional on-disk backend).
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            max_mb = float(os.environ.get("MORTGAGE_CACHE_MAX_MB", "256"))
+            _default_cache = ResultCache(
+                max_bytes=int(max_mb * 1024 * 1024),
+                path=os.environ.get("MORTGAGE_CACHE_PATH") or None,
+            )
+    return _default_cache
+
+
+def cached_calculate_mortgage(scenario: SingleScenario, return_schedule: bool = False, cache: Optional[ResultCache] = None) -> Dict[str, Any]:
+    """
+    calculate_mortgage with memoization through cache (default: the
+    process-wide cache).
+    """
+    if cache is None:
+        cache = get_default_cache()
+    result = cache.get(scenario, with_schedule=return_schedule)
+    if result is None:
+        result = calculate_mortgage(scenario, return_schedule=return_schedule)
+        cache.put(scenario, result, with_schedule=return_schedule)
+    return result
@@ -1,6 +1,9 @@
 import math
-from typing import List, Dict, Any
-from .models import SingleScenario
+from typing import List, Dict, Any, Optional, Union
+from .models import SingleScenario, LoanDetails, AnalysisSettings
+from .compact import CompactScenario, compact
+from .schedule import Schedule
+from .metrics import metrics
 
 def calculate_monthly_payment(principal: float, annual_rate: float, years: float) -> float:
     """
@@ -19,48 +22,119 @@ def calculate_monthly_payment(principal: float, annual_rate: float, years: float
     payment = principal * (monthly_rate * math.pow(1 + monthly_rate, num_payments)) / (math.pow(1 + monthly_rate, num_payments) - 1)
     return payment
 
-def calculate_mortgage(scenario: SingleScenario, return_schedule: bool = False, verbose: bool = False) -> Dict[str, Any]:
+class MortgageState:
     """
-    Simulates the mortgage.
-    If return_schedule is True, includes the full monthly data list in the return dict.
+    Everything the simulation loop carries from one month to the next.
+    A copy taken between months is a checkpoint the loop can resume from.
     """
-    loan_details = scenario.loan_details
-    original_principal = loan_details.principal
-    current_balance = original_principal
-    current_rate = loan_details.start_rate
-    total_years = loan_details.years
-    
-    analysis_window = scenario.analysis_settings
-    window_start = analysis_window.window_start_month if analysis_window else 1
-    window_end = analysis_window.window_end_month if analysis_window else 12
-    
-    # helper for lookups
-    rate_changes_map = {item.month: item.new_rate for item in scenario.rate_changes}
-    overpayments_map = {item.month: item.amount for item in scenario.overpayments}
-    
-    total_months_originally_planned = total_years * 12
-    
-    monthly_payment = calculate_monthly_payment(current_balance, current_rate, total_years)
+    __slots__ = (
+        "month", "balance", "rate", "monthly_payment", "total_months",
+        "window_start", "window_end",
+        "total_interest_paid", "total_principal_paid",
+        "window_interest", "window_principal", "balance_at_window_end",
+        "cumulative_interest", "cumulative_principal", "cumulative_total_paid",
+        "schedule", "finished",
+    )
 
-    total_interest_paid = 0
-    total_principal_paid = 0
-    
-    window_interest = 0
-    window_principal = 0
-    balance_at_window_end = 0
-    
-    month = 1
-    schedule_data = []
-    
-    cumulative_interest = 0
-    cumulative_principal = 0
-    cumulative_total_paid = 0
-    
-    if verbose:
-        print(f"\n--- Simulating: {scenario.name} ---")
-        print(f"Start Rate: {current_rate}%, Window: M{window_start}-{window_end}")
+    def __init__(self, loan_details: LoanDetails, analysis_settings: Optional[AnalysisSettings] = None, return_schedule: bool = False):
+        self._start(
+            loan_details.principal, loan_details.start_rate, loan_details.years,
+            analysis_settings.window_start_month if analysis_settings else 1,
+            analysis_settings.window_end_month if analysis_settings else 12,
+            return_schedule,
+        )
+
+    @classmethod
+    def for_scenario(cls, scenario: CompactScenario, return_schedule: bool = False) -> "MortgageState":
+        state = cls.__new__(cls)
+        state._start(scenario.principal, scenario.start_rate, scenario.years, scenario.window_start, scenario.window_end, return_schedule)
+        return state
+
+    def _start(self, principal: float, start_rate: float, years: int, window_start: int, window_end: int, return_schedule: bool):
+        self.month = 1
+        self.balance = principal
+        self.rate = start_rate
+        self.total_months = years * 12
+        self.monthly_payment = calculate_monthly_payment(self.balance, self.rate, years)
+
+        self.window_start = window_start
+        self.window_end = window_end
+
+        self.total_interest_paid = 0
+        self.total_principal_paid = 0
+
+        self.window_interest = 0
+        self.window_principal = 0
+        self.balance_at_window_end = 0
+
+        self.cumulative_interest = 0
+        self.cumulative_principal = 0
+        self.cumulative_total_paid = 0
+
+        self.schedule = [] if return_schedule else None
+        self.finished = False
+
+    def copy(self) -> "MortgageState":
+        clone = MortgageState.__new__(MortgageState)
+        for slot in MortgageState.__slots__:
+            setattr(clone, slot, getattr(self, slot))
+        if self.schedule is not None:
+            clone.schedule = list(self.schedule)
+        return clone
+
+    def result(self, name: str) -> Dict[str, Any]:
+        """
+        Builds the calculate_mortgage result dict from a finished state.
+        """
+        balance_at_window_end = self.balance_at_window_end
+        if self.month <= self.window_end:
+            balance_at_window_end = 0
+
+        result = {
+            "name": name,
+            "window_interest": self.window_interest,
+            "window_principal": self.window_principal,
+            "balance_at_window_end": balance_at_window_end,
+            "lifetime_interest": self.total_interest_paid
+        }
+
+        if self.schedule is not None:
+            result["schedule"] = Schedule.from_rows(self.schedule)
+
+        return result
+
+def run_months(state: MortgageState, rate_changes_map: Dict[int, float], overpayments_map: Dict[int, float], stop_month: Optional[int] = None, verbose: bool = False) -> MortgageState:
+    """
+    Advances the state month by month until the loan finishes or, if given,
+    until stop_month is reached (stop_month itself is not simulated).
+    """
+    # Work on locals in the hot loop and write them back at the end
+    month = state.month
+    current_balance = state.balance
+    current_rate = state.rate
+    monthly_payment = state.monthly_payment
+    total_months_originally_planned = state.total_months
+    window_start = state.window_start
+    window_end = state.window_end
+    total_interest_paid = state.total_interest_paid
+    total_principal_paid = state.total_principal_paid
+    window_interest = state.window_interest
+    window_principal = state.window_principal
+    balance_at_window_end = state.balance_at_window_end
+    cumulative_interest = state.cumulative_interest
+    cumulative_principal = state.cumulative_principal
+    cumulative_total_paid = state.cumulative_total_paid
+    schedule_data = state.schedule
+    return_schedule = schedule_data is not None
+    finished = state.finished
+
+    while not finished:
+        if current_balance <= 0.01:
+            finished = True
+            break
+        if stop_month is not None and month >= stop_month:
+            break
 
-    while current_balance > 0.01:
         start_balance = current_balance
         overpayment_amount = 0
         
@@ -108,19 +182,19 @@ def calculate_mortgage(scenario: SingleScenario, return_schedule: bool = False,
             cumulative_principal += (principal_component + overpayment_amount)
             cumulative_total_paid += amount_to_pay + overpayment_amount if month in overpayments_map else amount_to_pay 
             
-            schedule_data.append({
-                "Month": month,
-                "Rate (%)": current_rate,
-                "Start Balance": round(start_balance, 2),
-                "Monthly Payment": round(amount_to_pay, 2),
-                "Interest Paid": round(interest_payment, 2),
-                "Principal Paid": round(principal_component + overpayment_amount, 2), 
-                "Overpayment": round(overpayment_amount, 2),
-                "End Balance": round(max(0, current_balance), 2),
-                "Cumulative Interest": round(cumulative_interest, 2),
-                "Cumulative Principal": round(cumulative_principal, 2),
-                "Total Paid To Date": round(cumulative_total_paid, 2)
-            })
+            schedule_data.append((
+                month,
+                current_rate,
+                start_balance,
+                amount_to_pay,
+                interest_payment,
+                principal_component + overpayment_amount,
+                overpayment_amount,
+                max(0, current_balance),
+                cumulative_interest,
+                cumulative_principal,
+                cumulative_total_paid
+            ))
 
         if window_start <= month <= window_end:
             window_interest += interest_payment
@@ -131,25 +205,160 @@ def calculate_mortgage(scenario: SingleScenario, return_schedule: bool = False,
         if current_balance <= 0.001: 
              if month < window_end and balance_at_window_end == 0:
                  balance_at_window_end = 0
+             finished = True
              break
              
         month += 1
         
         if month > total_months_originally_planned * 2: 
+            finished = True
             break
-            
-    if month <= window_end:
-        balance_at_window_end = 0
-
-    result = {
-        "name": scenario.name,
-        "window_interest": window_interest,
-        "window_principal": window_principal,
-        "balance_at_window_end": balance_at_window_end,
-        "lifetime_interest": total_interest_paid
-    }
+
+    state.month = month
+    state.balance = current_balance
+    state.rate = current_rate
+    state.monthly_payment = monthly_payment
+    state.total_interest_paid = total_interest_paid
+    state.total_principal_paid = total_principal_paid
+    state.window_interest = window_interest
+    state.window_principal = window_principal
+    state.balance_at_window_end = balance_at_window_end
+    state.cumulative_interest = cumulative_interest
+    state.cumulative_principal = cumulative_principal
+    state.cumulative_total_paid = cumulative_total_paid
+    state.finished = finished
+    return state
+
+def run_segments(state: MortgageState, rate_changes_map: Dict[int, float], overpayments_map: Dict[int, float], stop_month: Optional[int] = None) -> MortgageState:
+    """
+    Summary-only equivalent of run_months.
+    Between events the balance follows the annuity recurrence
+    B(k) = B(1 + i)^k - P((1 + i)^k - 1) / i, so each stretch without a rate
+    change, overpayment or window boundary is evaluated in one step. Event
+    months and the last months before payoff are handed to run_months.
+    """
+    if state.schedule is not None:
+        raise ValueError("run_segments cannot record a schedule")
+
+    event_months = sorted(m for m in set(rate_changes_map) | set(overpayments_map) if m >= state.month)
+    next_event = 0
+    cap_month = state.total_months * 2 + 1
+
+    while not state.finished:
+        month = state.month
+        if state.balance <= 0.01:
+            state.finished = True
+            break
+        if stop_month is not None and month >= stop_month:
+            break
+
+        while next_event < len(event_months) and event_months[next_event] < month:
+            next_event += 1
+        if next_event < len(event_months) and event_months[next_event] == month:
+            run_months(state, rate_changes_map, overpayments_map, stop_month=month + 1)
+            continue
+
+        # The segment runs up to (not including) the next boundary
+        boundaries = [cap_month, state.window_start, state.window_end + 1]
+        if next_event < len(event_months):
+            boundaries.append(event_months[next_event])
+        if stop_month is not None:
+            boundaries.append(stop_month)
+        segment_end = min(b for b in boundaries if b > month)
+
+        balance = state.balance
+        payment = state.monthly_payment
+        monthly_interest_rate = state.rate / 100 / 12
+
+        # Shrink the jump until it stays clear of payoff, where the final
+        # payment is capped; those last months are stepped individually.
+        months = segment_end - month
+        while months > 0:
+            if monthly_interest_rate == 0:
+                end_balance = balance - months * payment
+            else:
+                growth = math.pow(1 + monthly_interest_rate, months)
+                end_balance = balance * growth - payment * (growth - 1) / monthly_interest_rate
+            if end_balance > 0.02:
+                break
+            months //= 2
+
+        if months == 0:
+            run_months(state, rate_changes_map, overpayments_map, stop_month=month + 1)
+            continue
+
+        principal_paid = balance - end_balance
+        interest_paid = months * payment - principal_paid
+
+        state.balance = end_balance
+        state.total_interest_paid += interest_paid
+        state.total_principal_paid += principal_paid
+
+        last_month = month + months - 1
+        if state.window_start <= month and last_month <= state.window_end:
+            state.window_interest += interest_paid
+            state.window_principal += principal_paid
+            if last_month == state.window_end:
+                state.balance_at_window_end = end_balance
+
+        state.month = month + months
+        if state.month > state.total_months * 2:
+            state.finished = True
+
+    return state
+
+def calculate_mortgage(scenario: Union[SingleScenario, CompactScenario], return_schedule: bool = False, verbose: bool = False, lifetime: str = "full") -> Dict[str, Any]:
+    """
+    Simulates the mortgage.
+    If return_schedule is True, includes the full monthly schedule (a
+    columnar Schedule) in the return dict.
+    With lifetime="analytic", months are only stepped through the end of the
+    analysis window and the rest of the term is evaluated with run_segments
+    (lifetime_interest to within a cent); with "skip" it is not computed
+    and lifetime_interest is None.
+    """
+    if lifetime not in ("full", "analytic", "skip"):
+        raise ValueError(f"lifetime must be one of full, analytic, skip, got {lifetime!r}")
+    if return_schedule and lifetime != "full":
+        raise ValueError("Schedules need lifetime='full'")
+
+    scenario = compact(scenario)
+    state = MortgageState.for_scenario(scenario, return_schedule=return_schedule)
+    rate_changes_map = scenario.rates
+    overpayments_map = scenario.overpayments
     
-    if return_schedule:
-        result["schedule"] = schedule_data
-        
+    if verbose:
+        print(f"\n--- Simulating: {scenario.name} ---")
+        print(f"Start Rate: {state.rate}%, Window: M{state.window_start}-{state.window_end}")
+
+    stop_month = None if lifetime == "full" else state.window_end + 1
+    with metrics.timed("simulation"):
+        run_months(state, rate_changes_map, overpayments_map, stop_month=stop_month, verbose=verbose)
+        months_stepped = state.month
+        if lifetime == "analytic":
+            run_segments(state, rate_changes_map, overpayments_map)
+    metrics.inc("scenarios_simulated")
+    metrics.inc("months_simulated", months_stepped)
+
+    result = state.result(scenario.name)
+    if lifetime == "skip":
+        result["lifetime_interest"] = None
     return result
+
+def calculate_mortgage_summary(scenario: Union[SingleScenario, CompactScenario]) -> Dict[str, Any]:
+    """
+    Fast path for callers that only need the summary numbers.
+    Jumps from event to event with the closed-form annuity balance instead
+    of iterating every month, so the cost is O(number of events). Matches
+    calculate_mortgage to within a cent.
+    """
+    scenario = compact(scenario)
+    state = MortgageState.for_scenario(scenario)
+    rate_changes_map = scenario.rates
+    overpayments_map = scenario.overpayments
+
+    with metrics.timed("simulation"):
+        run_segments(state, rate_changes_map, overpayments_map)
+    metrics.inc("scenarios_simulated")
+    metrics.inc("months_simulated", state.month)
+    return state.result(scenario.name)
@@ -0,0 +1,165 @@
+import numpy as np
+from typing import List, Dict, Any, Optional, Sequence
+from .schedule import Schedule
+
+# Points per plotted series
+DEFAULT_MAX_POINTS = 200
+
+DOWNSAMPLE_METHODS = ("lttb", "every")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of `threshold` points of (x, y)
+    that keep the visual shape of the line. First and last points are kept.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # Twice the area of the triangle (point a, candidate, next bucket's average)
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def downsample(x: np.ndarray, y: np.ndarray, max_points: int = DEFAULT_MAX_POINTS, method: str = "lttb") -> np.ndarray:
+    """
+    Indices of at most max_points points of the series, by LTTB or by
+    keeping every Nth point (plus the last). The first and last points are
+    always kept, so max_points must be at least 2.
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"method must be one of {', '.join(DOWNSAMPLE_METHODS)}, got {method!r}")
+    if max_points < 2:
+        raise ValueError(f"max_points must be at least 2, got {max_points}")
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+    # LTTB needs a bucket between the end points; with two points both methods keep just the ends
+    if method == "lttb" and max_points > 2:
+        return lttb(x, y, max_points)
+    step = -(-n // (max_points - 1))
+    indices = np.arange(0, n, step)
+    return indices if indices[-1] == n - 1 else np.append(indices, n - 1)
+
+
+def column_matrix(schedules: Sequence[Schedule], column: str) -> np.ndarray:
+    """
+    (months x scenarios) matrix of one schedule column. Schedules that end
+    early are extended with their final value (a paid-off loan stays paid off).
+    """
+    num_months = max((len(s) for s in schedules), default=0)
+    matrix = np.zeros((num_months, len(schedules)))
+    for j, schedule in enumerate(schedules):
+        values = schedule[column]
+        if len(values):
+            matrix[:len(values), j] = values
+            matrix[len(values):, j] = values[-1]
+    return matrix
+
+
+def envelope(schedules: Sequence[Schedule], column: str, max_points: int = DEFAULT_MAX_POINTS) -> Dict[str, np.ndarray]:
+    """
+    Min / median / max of column across scenarios, month by month.
+
+    When there are more months than max_points, months are grouped into
+    max_points buckets; each bucket keeps the lowest min and highest max
+    (so the band never looks narrower than it is) and its middle median.
+    """
+    matrix = column_matrix(schedules, column)
+    months = np.arange(1, matrix.shape[0] + 1)
+    low = matrix.min(axis=1) if matrix.size else np.empty(0)
+    mid = np.median(matrix, axis=1) if matrix.size else np.empty(0)
+    high = matrix.max(axis=1) if matrix.size else np.empty(0)
+
+    if len(months) > max_points:
+        edges = np.linspace(0, len(months), max_points + 1).astype(np.int64)
+        starts = edges[:-1]
+        centres = (edges[:-1] + edges[1:] - 1) // 2
+        low = np.minimum.reduceat(low, starts)
+        high = np.maximum.reduceat(high, starts)
+        mid = mid[centres]
+        months = months[centres]
+
+    return {"Month": months, "min": low, "median": mid, "max": high}
+
+
+def chart_data(
+    results: Sequence[Dict[str, Any]],
+    column: str,
+    top_n: int = 5,
+    selected: Sequence[str] = (),
+    rank_by: str = "lifetime_interest",
+    max_points: int = DEFAULT_MAX_POINTS,
+    method: str = "lttb",
+) -> Dict[str, Any]:
+    """
+    What to plot for one schedule column over many scenarios: the
+    min/median/max envelope across all of them plus, as individual lines,
+    the top_n scenarios by rank_by (lowest first) and any selected by name.
+    Every series is cut down to max_points points, so the payload size does
+    not depend on the number of scenarios or the loan term.
+    """
+    if max_points < 2:
+        raise ValueError(f"max_points must be at least 2, got {max_points}")
+    with_schedule = [r for r in results if 'schedule' in r]
+    ranked = sorted(with_schedule, key=lambda r: r[rank_by])
+    wanted = [r['name'] for r in ranked[:top_n]]
+    wanted += [name for name in selected if name not in wanted]
+    by_name = {r['name']: r for r in with_schedule}
+
+    series = []
+    for name in wanted:
+        r = by_name.get(name)
+        if r is None or not len(r['schedule']):
+            continue
+        x = r['schedule']["Month"]
+        y = r['schedule'][column]
+        keep = downsample(x, y, max_points, method)
+        series.append({"name": name, "Month": x[keep], column: y[keep]})
+
+    return {
+        "column": column,
+        "scenarios": len(with_schedule),
+        "envelope": envelope([r['schedule'] for r in with_schedule], column, max_points),
+        "series": series,
+    }
+
+
+def long_format(chart: Dict[str, Any], envelope_labels: Optional[Dict[str, str]] = None) -> Dict[str, List[Any]]:
+    """
+    chart_data output as Month / value / Series columns (one row per
+    point), the shape st.line_chart and most plotting libraries take.
+    """
+    column = chart["column"]
+    labels = envelope_labels or {"min": "Min (all scenarios)", "median": "Median (all scenarios)", "max": "Max (all scenarios)"}
+    months: List[Any] = []
+    values: List[Any] = []
+    names: List[str] = []
+
+    env = chart["envelope"]
+    if len(chart["series"]) < chart["scenarios"]:
+        for band, label in labels.items():
+            months.extend(env["Month"].tolist())
+            values.extend(env[band].tolist())
+            names.extend([label] * len(env["Month"]))
+
+    for s in chart["series"]:
+        months.extend(s["Month"].tolist())
+        values.extend(s[column].tolist())
+        names.extend([s["name"]] * len(s["Month"]))
+
+    return {"Month": months, column: values, "Series": names}
@@ -0,0 +1,385 @@
+"""
+Command-line front end of the comparison engine (run through
+mortgage_calculator.py or `python -m mortgage_lib.cli`).
+
+Only the engine itself is imported up front; pandas is never needed and
+openpyxl / pyarrow are imported by the report writers only when an export
+actually asks for them, so a --summary-only run starts quickly.
+"""
+import argparse
+import json
+import os
+from typing import List, Dict, Any, Optional, Sequence
+
+from .models import ScenarioConfig
+from .scenarios import ScenarioSpace
+from .executors import run_scenarios, EXECUTOR_KINDS
+from .search import top_k, RANKABLE_METRICS
+from .optimizer import optimize_overpayments, OPTIMIZABLE_METRICS
+from .batch import LIFETIME_MODES
+from .reports import export_reports, stream_reports, EXPORT_FORMATS
+from .portfolio import run_portfolio, write_monthly_totals_csv, PORTFOLIO_CHUNK_SIZE
+from .sharding import (
+    run_shard, run_sharded, merge_partials, missing_ranges, summarize, top_results,
+    shard_ranges, read_partial, write_partial, partial_filename, DEFAULT_TOP_K,
+)
+from .metrics import metrics, enable as enable_metrics
+
+DEFAULT_CONFIG = "mortgage_config.json"
+
+DEFAULT_FORMATS = ("csv", "excel")
+
+# Larger runs skip the per-scenario progress lines
+MAX_LISTED_SCENARIOS = 100
+
+
+def load_config(filepath: str) -> ScenarioConfig:
+    """Loads and validates the mortgage configuration from a JSON file."""
+    with open(filepath, 'r') as f:
+        data = json.load(f)
+    return ScenarioConfig(**data)
+
+
+def print_comparison(results: List[Dict[str, Any]], rank_by: Optional[str] = None):
+    """
+    Prints the comparison table. Rows keep scenario order unless rank_by is
+    given; the cheapest row (by window interest, or by rank_by) is marked.
+    """
+    metric = rank_by or 'window_interest'
+    if rank_by:
+        results = sorted(results, key=lambda r: r[rank_by])
+    best = min(r[metric] for r in results)
+
+    print(f"\n{'='*105}")
+    print(f"{'COMPARISON RESULTS':^105}")
+    print(f"{'='*105}")
+    print(f"{'Scenario Name':<45} | {'Window Int':<12} | {'Window Prin':<12} | {'Bal @ M24':<12} | {'Lifetime Int':<12}")
+    print("-" * 105)
+
+    for r in results:
+        name = r['name']
+        w_int = r['window_interest']
+        w_prin = r['window_principal']
+        bal = r['balance_at_window_end']
+        l_int = r['lifetime_interest']
+
+        is_cheaper = (abs(r[metric] - best) < 0.01)
+        cheaper_mark = "(CHEAPER)" if is_cheaper else ""
+
+        display_name = (name[:42] + '..') if len(name) > 42 else name
+        l_int_text = f"${l_int:<11,.2f}" if l_int is not None else f"{'n/a':<12}"
+        print(f"{display_name:<45} | ${w_int:<11,.2f} | ${w_prin:<11,.2f} | ${bal:<11,.2f} | {l_int_text} {cheaper_mark}")
+
+    print("-" * 105)
+
+
+def run_comparison_engine(
+    config_path: str,
+    executor: Optional[str] = None,
+    workers: Optional[int] = None,
+    top: Optional[int] = None,
+    rank_by: Optional[str] = None,
+    summary_only: bool = False,
+    formats: Sequence[str] = DEFAULT_FORMATS,
+    output_dir: Optional[str] = None,
+    lifetime: str = "full",
+):
+    print(f"\n{'='*60}")
+    print(f"{'MORTGAGE COMPARISON ENGINE':^60}")
+    print(f"{'='*60}\n")
+    print(f"Loading configuration from {config_path}...")
+    try:
+        with metrics.timed("validation"):
+            config = load_config(config_path)
+    except FileNotFoundError:
+        print("Error: Config file not found.")
+        return
+
+    output_dir = output_dir or os.path.dirname(os.path.abspath(config_path))
+    export = not summary_only and bool(formats)
+
+    if top:
+        # Branch-and-bound search: only the cheapest branches get simulated
+        metric = rank_by or "lifetime_interest"
+        print(f"\n[{'Calculation':^20}] Searching for the {top} cheapest scenarios by {metric}...")
+        with metrics.timed("simulation"):
+            results = top_k(config, top, metric=metric, return_schedule=export)
+    else:
+        scenarios = ScenarioSpace(config)
+
+        print(f"\n[{'Calculation':^20}] Processing {len(scenarios)} scenarios...")
+        if len(scenarios) <= MAX_LISTED_SCENARIOS:
+            for i in range(len(scenarios)):
+                print(f"  -> Simulating Scenario {i + 1}/{len(scenarios)}: {scenarios.name_at(i)}")
+        results = run_scenarios(scenarios, executor=executor, workers=workers, lifetime=lifetime)
+
+    print_comparison(results, rank_by)
+
+    if export:
+        cheapest = min(results, key=lambda r: r['lifetime_interest'] if r['lifetime_interest'] is not None else r['window_interest'])
+        print(f"\n[{'Reporting':^20}] Cheapest Scenario Identified: {cheapest['name']}")
+        if top:
+            export_reports(results, output_dir, formats=formats)
+        else:
+            # Re-simulates chunk by chunk so schedules never pile up in memory
+            stream_reports(scenarios, output_dir, formats=formats, executor=executor, workers=workers)
+
+    print(f"\n{'='*60}")
+    print(f"{'DONE':^60}")
+    print(f"{'='*60}")
+
+
+def run_overpayment_optimizer(config_path: str, annual_budget: float, metric: str = "lifetime_interest", years: Optional[int] = None):
+    """Finds the best overpayment months within an annual budget for every scenario."""
+    print(f"Loading configuration from {config_path}...")
+    try:
+        with metrics.timed("validation"):
+            config = load_config(config_path)
+    except FileNotFoundError:
+        print("Error: Config file not found.")
+        return
+
+    print(f"\n[{'Optimizer':^20}] Budget ${annual_budget:,.2f}/year, minimising {metric}")
+    print(f"\n{'Scenario Name':<45} | {'Baseline':<12} | {'Optimized':<12} | {'Saved':<12}")
+    print("-" * 92)
+    for scenario in ScenarioSpace(config).iter_compact():
+        r = optimize_overpayments(scenario, annual_budget, metric=metric, years=years)
+        display_name = (r['name'][:42] + '..') if len(r['name']) > 42 else r['name']
+        print(f"{display_name:<45} | ${r['baseline']:<11,.2f} | ${r['optimized']:<11,.2f} | ${r['interest_saved']:<11,.2f}")
+        plan = ", ".join(f"M{o['month']}: ${o['amount']:,.2f}" for o in r['overpayments'])
+        print(f"    Overpay: {plan}")
+    print("-" * 92)
+
+
+def parse_shard(text: str):
+    """Parses "I/N" (shard I of N, counting from 0)."""
+    try:
+        shard, num_shards = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, got {text!r}")
+    if not 0 <= shard < num_shards:
+        raise argparse.ArgumentTypeError(f"shard must be between 0 and {num_shards - 1}, got {shard}")
+    return shard, num_shards
+
+
+def positive_float(text: str) -> float:
+    try:
+        value = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number, got {text!r}")
+    if not value > 0:
+        raise argparse.ArgumentTypeError(f"must be positive, got {text}")
+    return value
+
+
+def positive_int(text: str) -> int:
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a whole number, got {text!r}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {text}")
+    return value
+
+
+def run_sharded_mode(
+    config_path: str,
+    shard: Optional[Sequence[int]] = None,
+    shards: Optional[int] = None,
+    merge: Optional[Sequence[str]] = None,
+    top: Optional[int] = None,
+    rank_by: Optional[str] = None,
+    workers: Optional[int] = None,
+    summary_only: bool = False,
+    formats: Sequence[str] = DEFAULT_FORMATS,
+    output_dir: Optional[str] = None,
+):
+    """
+    Runs one shard (writing its partial), all shards on local processes, or
+    merges partials written elsewhere, then reports the merged top scenarios.
+    """
+    try:
+        with metrics.timed("validation"):
+            config = load_config(config_path)
+    except FileNotFoundError:
+        print("Error: Config file not found.")
+        return
+
+    output_dir = output_dir or os.path.dirname(os.path.abspath(config_path))
+    k = top or DEFAULT_TOP_K
+    metric = rank_by or "lifetime_interest"
+
+    if shard is not None:
+        index, num_shards = shard
+        total = len(ScenarioSpace(config))
+        r = shard_ranges(total, num_shards)[index]
+        print(f"\n[{'Shard':^20}] Simulating scenarios {r.start}..{r.stop - 1} of {total} (shard {index}/{num_shards})...")
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, partial_filename(index, num_shards))
+        write_partial(run_shard(config, r.start, r.stop, k), path)
+        print(f"[{'Shard':^20}] Partial result written to {path}")
+        return
+
+    if merge:
+        print(f"\n[{'Merge':^20}] Merging {len(merge)} partial results...")
+        merged = merge_partials([read_partial(path) for path in merge])
+    else:
+        print(f"\n[{'Shards':^20}] Running {shards} shards on local processes...")
+        merged = run_sharded(config, shards, k=k, workers=workers)
+    if top:
+        # Partials written by other runs may keep more than the top asked for here
+        merged["top"] = {name: entries[:top] for name, entries in merged["top"].items()}
+
+    missing = missing_ranges(merged)
+    if missing:
+        print(f"Warning: scenarios not covered by any shard: {', '.join(f'{a}..{b - 1}' for a, b in missing)}")
+
+    stats = summarize(merged)
+    print(f"\n{'Metric':<24} | {'Scenarios':<10} | {'Mean':<14} | {'Min':<14} | {'Max':<14}")
+    print("-" * 86)
+    for field, st in stats.items():
+        low, high = (f"{v:<14,.2f}" if v is not None else f"{'n/a':<14}" for v in (st['min'], st['max']))
+        print(f"{field:<24} | {st['count']:<10,} | {st['mean']:<14,.2f} | {low} | {high}")
+    print("-" * 86)
+
+    export = not summary_only and bool(formats)
+    results = top_results(config, merged, metric, return_schedule=export)
+    print_comparison(results, metric)
+    if export:
+        export_reports(results, output_dir, formats=formats)
+
+
+def run_portfolio_mode(
+    loans_path: str,
+    executor: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = PORTFOLIO_CHUNK_SIZE,
+    summary_only: bool = False,
+    output_dir: Optional[str] = None,
+):
+    """Simulates a book of loans from CSV/Parquet and reports its aggregate cash flows."""
+    print(f"\n[{'Portfolio':^20}] Simulating loans from {loans_path} in chunks of {chunk_size}...")
+    try:
+        result = run_portfolio(loans_path, chunk_size=chunk_size, executor=executor, workers=workers)
+    except FileNotFoundError:
+        print("Error: Loan file not found.")
+        return
+
+    monthly = result['monthly_totals']
+    print(f"\n{'Loans':<28} {result['loans']:,}")
+    print(f"{'Total Principal':<28} ${result['principal']:,.2f}")
+    print(f"{'Total Lifetime Interest':<28} ${result['lifetime_interest']:,.2f}")
+    print(f"{'Months Until Book Paid Off':<28} {len(monthly['Month'])}")
+    print(f"\n{'Per Loan':<20} | {'Mean':<14} | {'p5':<14} | {'p50':<14} | {'p95':<14}")
+    print("-" * 86)
+    for name, d in result['distributions'].items():
+        print(f"{name:<20} | {d['mean']:<14,.2f} | {d.get('p5', 0):<14,.2f} | {d.get('p50', 0):<14,.2f} | {d.get('p95', 0):<14,.2f}")
+    print("-" * 86)
+
+    if not summary_only:
+        output_dir = output_dir or os.path.dirname(os.path.abspath(loans_path))
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, "portfolio_monthly_totals.csv")
+        write_monthly_totals_csv(result, path)
+        print(f"\n[{'Reporting':^20}] Monthly totals written to {path}")
+
+
+def build_parser(default_config: str = DEFAULT_CONFIG) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Branching mortgage comparison engine")
+    parser.add_argument("config", nargs="?", default=default_config,
+                        help=f"Path to the scenario config JSON (default: {default_config})")
+    parser.add_argument("--executor", choices=EXECUTOR_KINDS, default=None,
+                        help="How to run scenarios (default: $MORTGAGE_EXECUTOR or serial)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker count for thread/process executors (default: $MORTGAGE_WORKERS or all cores)")
+    parser.add_argument("--summary-only", action="store_true",
+                        help="Only print the comparison table; skip schedules and exports")
+    parser.add_argument("--formats", nargs="+", choices=EXPORT_FORMATS, default=list(DEFAULT_FORMATS),
+                        help="Report formats to write (default: csv excel)")
+    parser.add_argument("--output-dir", default=None,
+                        help="Directory for the reports (default: the config file's directory)")
+    parser.add_argument("--top", type=int, default=None,
+                        help="Only find and report the N cheapest scenarios (branch-and-bound search; with sharding, the top-K kept per shard)")
+    parser.add_argument("--rank-by", choices=RANKABLE_METRICS, default=None,
+                        help="Sort the table by this metric (also the metric used by --top, default: lifetime_interest)")
+    parser.add_argument("--lifetime", choices=LIFETIME_MODES, default="full",
+                        help="Lifetime interest in the table: simulated to payoff (full), in closed form after the "
+                             "analysis window (analytic, to within a cent), or not computed (skip). "
+                             "Only for the plain comparison run")
+    parser.add_argument("--optimize-overpayments", type=positive_float, default=None, metavar="ANNUAL_BUDGET",
+                        help="Instead of comparing, find the best months to overpay with this yearly budget")
+    parser.add_argument("--optimize-metric", choices=OPTIMIZABLE_METRICS, default="lifetime_interest",
+                        help="Metric minimised by --optimize-overpayments (default: lifetime_interest)")
+    parser.add_argument("--optimize-years", type=positive_int, default=None,
+                        help="Number of loan years to plan overpayments for (default: whole term)")
+    parser.add_argument("--portfolio", default=None, metavar="LOANS_FILE",
+                        help="Instead of comparing, simulate a book of loans from CSV/Parquet and report monthly totals")
+    parser.add_argument("--chunk-size", type=int, default=PORTFOLIO_CHUNK_SIZE,
+                        help=f"Loans per simulated chunk in --portfolio mode (default: {PORTFOLIO_CHUNK_SIZE})")
+    parser.add_argument("--shard", type=parse_shard, default=None, metavar="I/N",
+                        help="Run only shard I of N of the scenario space and write its partial result (top --top per metric)")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="Split the scenario space into N shards, run them on local processes and merge")
+    parser.add_argument("--merge", nargs="+", default=None, metavar="PARTIAL",
+                        help="Merge partial results written by --shard runs and report the combined top scenarios")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print time spent per stage and scenario/month counts at the end")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None, default_config: str = DEFAULT_CONFIG) -> int:
+    parser = build_parser(default_config)
+    args = parser.parse_args(argv)
+    if args.lifetime == "skip" and args.rank_by == "lifetime_interest":
+        parser.error("--rank-by lifetime_interest needs --lifetime full or analytic")
+    other_mode = args.top or args.shard is not None or args.shards or args.merge or args.portfolio or args.optimize_overpayments is not None
+    if args.lifetime != "full" and other_mode:
+        parser.error("--lifetime analytic/skip cannot be combined with --top, sharding, --portfolio or --optimize-overpayments")
+    if args.profile:
+        enable_metrics()
+
+    if args.shard is not None or args.shards or args.merge:
+        run_sharded_mode(
+            args.config,
+            shard=args.shard,
+            shards=args.shards,
+            merge=args.merge,
+            top=args.top,
+            rank_by=args.rank_by,
+            workers=args.workers,
+            summary_only=args.summary_only,
+            formats=args.formats,
+            output_dir=args.output_dir,
+        )
+    elif args.portfolio:
+        run_portfolio_mode(
+            args.portfolio,
+            executor=args.executor,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            summary_only=args.summary_only,
+            output_dir=args.output_dir,
+        )
+    elif args.optimize_overpayments is not None:
+        run_overpayment_optimizer(args.config, args.optimize_overpayments, metric=args.optimize_metric, years=args.optimize_years)
+    else:
+        run_comparison_engine(
+            args.config,
+            executor=args.executor,
+            workers=args.workers,
+            top=args.top,
+            rank_by=args.rank_by,
+            summary_only=args.summary_only,
+            formats=args.formats,
+            output_dir=args.output_dir,
+            lifetime=args.lifetime,
+        )
+
+    if args.profile:
+        print(f"\n[{'Profile':^20}]")
+        print(metrics.format_summary())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+from typing import Dict, Any, Optional, Union
+from .models import SingleScenario, LoanDetails, AnalysisSettings, SingleRateChange, Overpayment
+
+
+class CompactScenario:
+    """
+    Engine-side form of a SingleScenario: plain numbers plus the
+    month -> value lookups the simulation uses, ordered by month. Building
+    one skips pydantic validation and the nested event models, and the
+    engines use the lookups as they are instead of rebuilding them.
+
+    Event dicts may be shared between scenarios (every branch of a config
+    shares its overpayments), so they must not be modified in place.
+    """
+
+    __slots__ = ("name", "principal", "start_rate", "years", "window_start", "window_end", "rates", "overpayments")
+
+    def __init__(
+        self,
+        name: str,
+        principal: float,
+        start_rate: float,
+        years: int,
+        window_start: int = 1,
+        window_end: int = 12,
+        rates: Optional[Dict[int, float]] = None,
+        overpayments: Optional[Dict[int, float]] = None,
+    ):
+        self.name = name
+        self.principal = principal
+        self.start_rate = start_rate
+        self.years = years
+        self.window_start = window_start
+        self.window_end = window_end
+        self.rates = rates if rates is not None else {}
+        self.overpayments = overpayments if overpayments is not None else {}
+
+    @classmethod
+    def from_model(cls, scenario: SingleScenario) -> "CompactScenario":
+        loan = scenario.loan_details
+        window = scenario.analysis_settings
+        # Later events for the same month win, as in the original dict lookups
+        rates = {item.month: item.new_rate for item in scenario.rate_changes}
+        overpayments = {item.month: item.amount for item in scenario.overpayments}
+        return cls(
+            scenario.name,
+            loan.principal,
+            loan.start_rate,
+            loan.years,
+            window.window_start_month if window else 1,
+            window.window_end_month if window else 12,
+            dict(sorted(rates.items())),
+            dict(sorted(overpayments.items())),
+        )
+
+    def to_model(self) -> SingleScenario:
+        return SingleScenario(
+            name=self.name,
+            loan_details=LoanDetails(principal=self.principal, start_rate=self.start_rate, years=self.years),
+            rate_changes=[SingleRateChange(month=m, new_rate=r) for m, r in self.rates.items()],
+            overpayments=[Overpayment(month=m, amount=a) for m, a in self.overpayments.items()],
+            analysis_settings=AnalysisSettings(window_start_month=self.window_start, window_end_month=self.window_end),
+        )
+
+    def replace(self, **changes: Any) -> "CompactScenario":
+        """
+        Copy with some fields changed (event dicts are shared unless replaced).
+        """
+        clone = CompactScenario.__new__(CompactScenario)
+        for slot in CompactScenario.__slots__:
+            setattr(clone, slot, changes.get(slot, getattr(self, slot)))
+        return clone
+
+    def __repr__(self) -> str:
+        return f"CompactScenario({self.name!r}, {len(self.rates)} rate changes, {len(self.overpayments)} overpayments)"
+
+
+def compact(scenario: Union[SingleScenario, CompactScenario]) -> CompactScenario:
+    """
+    The compact form of a scenario (returned as is if it already is one).
+    """
+    if isinstance(scenario, CompactScenario):
+        return scenario
+    return CompactScenario.from_model(scenario)
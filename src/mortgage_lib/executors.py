@@ -0,0 +1,233 @@
+import functools
+import math
+import os
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Deque, Optional, Sequence, Tuple
+from .batch import calculate_mortgage_batch, run_batch, take_inputs
+from .scenarios import ScenarioSpace, MultiScenarioSpace
+from .cache import ResultCache
+from .metrics import metrics
+
+EXECUTOR_KINDS = ("serial", "thread", "process")
+
+# Largest chunk handed to a worker; the batch engine gains little past this
+MAX_CHUNK_SIZE = 2000
+
+# One pool per kind, kept for the life of the process; asking for another
+# worker count replaces it
+_pools: Dict[str, Tuple[int, Executor]] = {}
+_pools_lock = threading.Lock()
+
+
+def default_executor() -> str:
+    """
+    Executor kind from the MORTGAGE_EXECUTOR environment variable (default serial).
+    """
+    kind = os.environ.get("MORTGAGE_EXECUTOR", "serial").lower()
+    if kind not in EXECUTOR_KINDS:
+        raise ValueError(f"MORTGAGE_EXECUTOR must be one of {', '.join(EXECUTOR_KINDS)}, got {kind!r}")
+    return kind
+
+
+def default_workers() -> int:
+    """
+    Worker count from the MORTGAGE_WORKERS environment variable (default: all cores).
+    """
+    workers = os.environ.get("MORTGAGE_WORKERS")
+    return int(workers) if workers else (os.cpu_count() or 1)
+
+
+def get_pool(kind: str, workers: int) -> Optional[Executor]:
+    """
+    Returns the shared pool for kind, creating it on first use. If it was
+    created with a different worker count it is shut down (work already
+    submitted still finishes) and replaced. The serial executor has no pool
+    and returns None.
+    """
+    if kind not in EXECUTOR_KINDS:
+        raise ValueError(f"Unknown executor {kind!r}; expected one of {', '.join(EXECUTOR_KINDS)}")
+    if kind == "serial":
+        return None
+
+    with _pools_lock:
+        pool_workers, pool = _pools.get(kind, (None, None))
+        if pool_workers != workers:
+            if pool is not None:
+                pool.shutdown(wait=False)
+            if kind == "thread":
+                pool_class = ThreadPoolExecutor
+            else:
+                # multiprocessing is slow to import; only pay for it when used
+                from concurrent.futures import ProcessPoolExecutor as pool_class
+            pool = pool_class(max_workers=workers)
+            _pools[kind] = (workers, pool)
+    return pool
+
+
+def shutdown_pools():
+    """
+    Shuts down every pool created by get_pool.
+    """
+    with _pools_lock:
+        for _, pool in _pools.values():
+            pool.shutdown(wait=True)
+        _pools.clear()
+
+
+def chunk_size_for(num_items: int, workers: int) -> int:
+    """
+    Aims for about four chunks per worker so stragglers even out.
+    """
+    return max(1, min(MAX_CHUNK_SIZE, math.ceil(num_items / (workers * 4))))
+
+
+def map_chunks(
+    fn: Callable[[Sequence[Any]], List[Any]],
+    items: Sequence[Any],
+    executor: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> List[Any]:
+    """
+    Splits items into chunks, runs fn over each chunk on the chosen executor
+    and returns the concatenated outputs in input order.
+    fn must be a module-level function for the process executor, and items
+    must support slicing (lists and ScenarioSpace both do).
+    """
+    kind = executor or default_executor()
+    workers = workers or default_workers()
+    chunk_size = chunk_size or chunk_size_for(len(items), workers)
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+    pool = get_pool(kind, workers)
+    outputs = map(fn, chunks) if pool is None else pool.map(fn, chunks)
+
+    results: List[Any] = []
+    for output in outputs:
+        results.extend(output)
+    return results
+
+
+def simulate_chunk(
+    scenarios: Sequence[Any],
+    return_schedule: bool = False,
+    lifetime: str = "full",
+    rows: Optional[Sequence[int]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Worker entry point: simulates one chunk of scenarios with the batch engine.
+    A ScenarioSpace (or MultiScenarioSpace) slice goes straight to the
+    engine's arrays without building any scenario objects. With rows, only
+    those positions of the chunk are simulated.
+    """
+    if isinstance(scenarios, (ScenarioSpace, MultiScenarioSpace)):
+        with metrics.timed("expansion"):
+            inputs = scenarios.batch_inputs()
+            if rows is not None:
+                inputs = take_inputs(inputs, rows)
+        metrics.inc("scenarios_expanded", len(inputs["names"]))
+        return run_batch(inputs, return_schedule=return_schedule, lifetime=lifetime)
+    scenarios = _expand(scenarios)
+    if rows is not None:
+        scenarios = [scenarios[i] for i in rows]
+    return calculate_mortgage_batch(scenarios, return_schedule=return_schedule, lifetime=lifetime)
+
+
+def _expand(scenarios: Sequence[Any]) -> List[Any]:
+    """
+    Materialises a chunk (the compact scenarios of a ScenarioSpace slice).
+    """
+    if isinstance(scenarios, list):
+        return scenarios
+    with metrics.timed("expansion"):
+        expanded = list(scenarios.iter_compact()) if isinstance(scenarios, (ScenarioSpace, MultiScenarioSpace)) else list(scenarios)
+    metrics.inc("scenarios_expanded", len(expanded))
+    return expanded
+
+
+def _simulate_chunk_with_schedule(scenarios: Sequence[Any]) -> List[Dict[str, Any]]:
+    return simulate_chunk(scenarios, return_schedule=True)
+
+
+def run_scenarios(
+    scenarios: Sequence[Any],
+    return_schedule: bool = False,
+    executor: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    cache: Optional[ResultCache] = None,
+    lifetime: str = "full",
+) -> List[Dict[str, Any]]:
+    """
+    Simulates scenarios (a list or a ScenarioSpace) in chunks on the chosen
+    executor. Results come back in scenario order whatever the executor.
+    With a cache, only scenarios missing from it are simulated.
+    lifetime is passed to calculate_mortgage_batch; only full results are
+    cached, so other modes bypass the cache.
+    """
+    fn = _simulate_chunk_with_schedule if return_schedule else simulate_chunk
+    if lifetime != "full":
+        fn = functools.partial(simulate_chunk, return_schedule=return_schedule, lifetime=lifetime)
+        cache = None
+    if cache is None:
+        return map_chunks(fn, scenarios, executor=executor, workers=workers, chunk_size=chunk_size)
+
+    return _map_chunks_cached(scenarios, cache, return_schedule, executor=executor, workers=workers, chunk_size=chunk_size)
+
+
+def _map_chunks_cached(
+    scenarios: Sequence[Any],
+    cache: ResultCache,
+    return_schedule: bool,
+    executor: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    map_chunks for run_scenarios with a cache: each chunk is looked up as it
+    is reached, so only that chunk's scenarios are built for the keys, and
+    its misses are simulated from the chunk itself (batch_inputs for a
+    ScenarioSpace slice). A few chunks per worker are kept in flight.
+    """
+    kind = executor or default_executor()
+    workers = workers or default_workers()
+    chunk_size = chunk_size or chunk_size_for(len(scenarios), workers)
+    pool = get_pool(kind, workers)
+    max_pending = 0 if pool is None else workers * 2
+
+    results: List[Dict[str, Any]] = []
+    pending: Deque[Tuple[List[Any], List[Any], List[int], Any]] = deque()
+
+    def finish():
+        chunk_results, keyed, missing, computed = pending.popleft()
+        if isinstance(computed, Future):
+            computed = computed.result()
+        for i, result in zip(missing, computed):
+            cache.put(keyed[i], result, with_schedule=return_schedule)
+            chunk_results[i] = result
+        results.extend(chunk_results)
+
+    for start in range(0, len(scenarios), chunk_size):
+        chunk = scenarios[start:start + chunk_size]
+        keyed = _expand(chunk)
+        chunk_results = [cache.get(s, with_schedule=return_schedule) for s in keyed]
+        missing = [i for i, r in enumerate(chunk_results) if r is None]
+        if isinstance(chunk, (ScenarioSpace, MultiScenarioSpace)):
+            # Workers rebuild the misses from the slice's arrays
+            work, rows = chunk, (None if len(missing) == len(keyed) else missing)
+        else:
+            work, rows = [keyed[i] for i in missing], None
+        if not missing:
+            computed: Any = []
+        elif pool is None:
+            computed = simulate_chunk(work, return_schedule, "full", rows)
+        else:
+            computed = pool.submit(simulate_chunk, work, return_schedule, "full", rows)
+        pending.append((chunk_results, keyed, missing, computed))
+        while len(pending) > max_pending:
+            finish()
+    while pending:
+        finish()
+    return results
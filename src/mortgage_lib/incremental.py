@@ -0,0 +1,184 @@
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+from .models import SingleScenario
+from .compact import CompactScenario, compact
+from .calculation import MortgageState, run_months
+from .cache import scenario_key
+from .schedule import Schedule
+
+# Months between saved checkpoints
+CHECKPOINT_EVERY = 12
+
+
+class _Run:
+    """
+    One simulated scenario: its inputs, the finished result (schedule
+    included) and the loan state at the start of every CHECKPOINT_EVERY-th
+    month. Checkpoints hold no schedule rows; a run resumed from one takes
+    the rows before it from the earlier run's schedule.
+    """
+
+    __slots__ = ("loan", "window", "rates", "overpayments", "checkpoints", "result")
+
+    def __init__(self, loan: Tuple, window: Tuple[int, int], rates: Dict[int, float], overpayments: Dict[int, float]):
+        self.loan = loan
+        self.window = window
+        self.rates = rates
+        self.overpayments = overpayments
+        self.checkpoints: List[MortgageState] = []
+        self.result: Optional[Dict[str, Any]] = None
+
+
+def _inputs(scenario: CompactScenario) -> Tuple[Tuple, Tuple[int, int], Dict[int, float], Dict[int, float]]:
+    return (
+        (scenario.principal, scenario.start_rate, scenario.years),
+        (scenario.window_start, scenario.window_end),
+        scenario.rates,
+        scenario.overpayments,
+    )
+
+
+_MISSING = object()
+
+
+def _first_difference(a: Dict[int, float], b: Dict[int, float]) -> Optional[int]:
+    if a == b:
+        return None
+    return min(m for m in a.keys() | b.keys() if a.get(m, _MISSING) != b.get(m, _MISSING))
+
+
+def first_affected_month(run: _Run, loan: Tuple, window: Tuple[int, int], rates: Dict[int, float], overpayments: Dict[int, float]) -> int:
+    """
+    First month whose simulation can differ between run and the given
+    inputs; everything before it can be reused. 1 means nothing can.
+    """
+    if loan != run.loan:
+        return 1
+    candidates = [
+        _first_difference(run.rates, rates),
+        _first_difference(run.overpayments, overpayments),
+    ]
+    if window != run.window:
+        # Window totals are zero before either window opens
+        candidates.append(min(window[0], run.window[0]))
+    months = [m for m in candidates if m is not None]
+    return max(1, min(months)) if months else run.checkpoints[-1].month + 1
+
+
+class IncrementalSimulator:
+    """
+    calculate_mortgage with memory of earlier runs, for interactive use.
+
+    Results are kept per scenario_key, so an unchanged scenario is returned
+    as is. A changed scenario resumes from the latest checkpoint of the
+    most similar earlier run (same loan, longest shared prefix of events),
+    so editing e.g. one overpayment month only re-simulates the months from
+    that one on. Results always include the schedule and are identical to
+    calculate_mortgage(scenario, return_schedule=True).
+
+    At most max_runs runs are kept (least recently used dropped first).
+    """
+
+    def __init__(self, max_runs: int = 256, checkpoint_every: int = CHECKPOINT_EVERY):
+        self.max_runs = max_runs
+        self.checkpoint_every = checkpoint_every
+        self._runs: "OrderedDict[str, _Run]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.resumed = 0
+        self.months_reused = 0
+        self.months_simulated = 0
+
+    def simulate(self, scenario: Union[SingleScenario, CompactScenario]) -> Dict[str, Any]:
+        scenario = compact(scenario)
+        key = scenario_key(scenario)
+        with self._lock:
+            run = self._runs.get(key)
+            if run is not None:
+                self._runs.move_to_end(key)
+                self.hits += 1
+                return self._present(run, scenario.name)
+
+            loan, window, rates, overpayments = _inputs(scenario)
+            base, start = self._best_prefix(loan, window, rates, overpayments)
+
+        run = _Run(loan, window, rates, overpayments)
+        if base is not None and start > 1:
+            checkpoint = max((cp for cp in base.checkpoints if cp.month <= start), key=lambda cp: cp.month)
+            state = checkpoint.copy()
+            state.window_start, state.window_end = window
+            state.schedule = []
+            reused = checkpoint.month - 1
+            prefix = base.result["schedule"].rows(slice(0, reused))
+            run.checkpoints = [cp for cp in base.checkpoints if cp.month <= checkpoint.month]
+        else:
+            state = MortgageState.for_scenario(scenario, return_schedule=True)
+            run.checkpoints = [self._checkpoint(state)]
+            reused = 0
+            prefix = None
+
+        start_month = state.month
+        while not state.finished:
+            next_stop = (state.month // self.checkpoint_every + 1) * self.checkpoint_every + 1
+            run_months(state, rates, overpayments, stop_month=next_stop)
+            if not state.finished:
+                run.checkpoints.append(self._checkpoint(state))
+
+        run.result = state.result("")
+        run.result.pop("name")
+        if prefix is not None:
+            run.result["schedule"] = Schedule.concat([prefix, run.result["schedule"]])
+
+        with self._lock:
+            if reused:
+                self.resumed += 1
+            self.months_reused += reused
+            self.months_simulated += state.month - start_month
+            self._runs[key] = run
+            self._runs.move_to_end(key)
+            while len(self._runs) > self.max_runs:
+                self._runs.popitem(last=False)
+            return self._present(run, scenario.name)
+
+    def simulate_many(self, scenarios: Sequence[Union[SingleScenario, CompactScenario]]) -> List[Dict[str, Any]]:
+        return [self.simulate(scenario) for scenario in scenarios]
+
+    def clear(self):
+        with self._lock:
+            self._runs.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "runs": len(self._runs),
+                "hits": self.hits,
+                "resumed": self.resumed,
+                "months_reused": self.months_reused,
+                "months_simulated": self.months_simulated,
+            }
+
+    def _best_prefix(self, loan: Tuple, window: Tuple[int, int], rates: Dict[int, float], overpayments: Dict[int, float]) -> Tuple[Optional[_Run], int]:
+        best, best_month = None, 1
+        for run in reversed(self._runs.values()):
+            month = first_affected_month(run, loan, window, rates, overpayments)
+            if month > best_month:
+                best, best_month = run, month
+        return best, best_month
+
+    @staticmethod
+    def _checkpoint(state: MortgageState) -> MortgageState:
+        rows = state.schedule
+        state.schedule = None
+        checkpoint = state.copy()
+        state.schedule = rows
+        return checkpoint
+
+    @staticmethod
+    def _present(run: _Run, name: str) -> Dict[str, Any]:
+        """
+        The stored result under name. The schedule is shared between calls,
+        so it should not be modified.
+        """
+        return {"name": name, **run.result}
@@ -0,0 +1,179 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple
+
+# Stages timed by the engine, in pipeline order
+STAGES = ("validation", "expansion", "simulation", "serialization", "export", "request")
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+# Counter names and their help text for the Prometheus exposition
+COUNTERS = {
+    "scenarios_expanded": "Scenarios built from configs",
+    "scenarios_simulated": "Scenarios simulated",
+    "months_simulated": "Loan months simulated",
+    "cache_hits": "Result cache hits",
+    "cache_misses": "Result cache misses",
+}
+
+_NOOP = nullcontext()
+
+
+def sample_value(value: float) -> str:
+    """
+    A sample value written exactly: counters and byte counts stay whole
+    numbers however large (":g" would cut them to six digits).
+    """
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Histogram:
+    """
+    Cumulative-bucket duration histogram in the Prometheus style.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """
+        (upper bound, observations <= bound) pairs, ending with +Inf.
+        """
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            pairs.append(("+Inf" if bound == float("inf") else f"{bound:g}", total))
+        return pairs
+
+
+class Metrics:
+    """
+    Process-wide counters and per-stage duration histograms.
+
+    Recording is off unless enabled (MORTGAGE_METRICS=1, or enable()); when
+    off, inc() and timed() return after a single flag check, so the hot
+    paths can stay instrumented.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters: Dict[str, float] = {name: 0 for name in COUNTERS}
+            self.histograms: Dict[str, Histogram] = {stage: Histogram() for stage in STAGES}
+
+    def inc(self, name: str, value: float = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, stage: str, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def timed(self, stage: str):
+        """
+        Context manager recording the duration of its block under stage.
+        """
+        if not self.enabled:
+            return _NOOP
+        return self._timed(stage)
+
+    @contextmanager
+    def _timed(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "counters": dict(self.counters),
+                "stages": {
+                    stage: {"count": h.count, "seconds": h.sum}
+                    for stage, h in self.histograms.items()
+                },
+            }
+
+    def render_prometheus(self, extra_gauges: Optional[Dict[str, float]] = None) -> str:
+        """
+        The metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for name, value in self.counters.items():
+                metric = f"mortgage_{name}_total"
+                lines.append(f"# HELP {metric} {COUNTERS.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {sample_value(value)}")
+
+            lines.append("# HELP mortgage_stage_duration_seconds Time spent per pipeline stage")
+            lines.append("# TYPE mortgage_stage_duration_seconds histogram")
+            for stage, h in self.histograms.items():
+                for bound, count in h.cumulative():
+                    lines.append(f'mortgage_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'mortgage_stage_duration_seconds_sum{{stage="{stage}"}} {h.sum:.6f}')
+                lines.append(f'mortgage_stage_duration_seconds_count{{stage="{stage}"}} {h.count}')
+
+        for name, value in (extra_gauges or {}).items():
+            metric = f"mortgage_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {sample_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def format_summary(self) -> str:
+        """
+        Human-readable per-stage timings and counters (for --profile).
+        Stages can nest (an export simulates its scenarios), so the times
+        are not meant to add up.
+        """
+        snap = self.snapshot()
+        lines = [f"{'Stage':<15} {'Calls':>8} {'Seconds':>10} {'Avg ms':>10}"]
+        for stage, s in snap["stages"].items():
+            if s["count"]:
+                lines.append(f"{stage:<15} {s['count']:>8} {s['seconds']:>10.4f} {s['seconds'] / s['count'] * 1000:>10.3f}")
+        lines.append("")
+        for name, value in snap["counters"].items():
+            lines.append(f"{name:<20} {value:>14,.0f}")
+        return "\n".join(lines)
+
+
+def _env_enabled() -> bool:
+    return os.environ.get("MORTGAGE_METRICS", "").lower() in ("1", "true", "yes", "on")
+
+
+metrics = Metrics(enabled=_env_enabled())
+
+
+def enable(flag: bool = True):
+    """
+    Turns recording on (or off) for this process.
+    """
+    metrics.enabled = flag
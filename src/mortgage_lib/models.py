@@ -1,5 +1,5 @@
-from typing import List, Union, Optional
-from pydantic import BaseModel
+from typing import List, Union, Optional, Literal, Annotated
+from pydantic import BaseModel, Field
 
 class AnalysisSettings(BaseModel):
     window_start_month: int = 1
@@ -34,3 +34,36 @@ class SingleScenario(BaseModel):
     rate_changes: List[SingleRateChange] = []
     overpayments: List[Overpayment] = []
     analysis_settings: Optional[AnalysisSettings] = None
+
+class OverpaymentOptimization(BaseModel):
+    config: ScenarioConfig
+    annual_budget: float = Field(gt=0)
+    metric: Literal["lifetime_interest", "window_interest"] = "lifetime_interest"
+    years: Optional[int] = Field(None, ge=1)
+
+class RateModel(BaseModel):
+    # Short-rate model for Monte Carlo paths, stepped monthly (rates in %)
+    kind: Literal["random_walk", "vasicek", "cir"] = "vasicek"
+    volatility: float = 1.0
+    mean_reversion: float = 0.5
+    long_run_rate: Optional[float] = None
+    min_rate: float = 0.0
+
+# Upper bounds on a Monte Carlo request, so one request cannot take the
+# server's CPU and memory with it
+MAX_MONTE_CARLO_PATHS = 1_000_000
+MAX_BALANCE_SAMPLE_PATHS = 10_000
+
+class MonteCarloSettings(BaseModel):
+    paths: int = Field(10000, gt=0, le=MAX_MONTE_CARLO_PATHS)
+    seed: Optional[int] = None
+    rate_model: RateModel = RateModel()
+    first_reset_month: int = Field(13, ge=1)
+    reset_every_months: int = Field(12, gt=0)
+    chunk_size: int = Field(10000, gt=0)
+    balance_sample_paths: int = Field(2000, ge=0, le=MAX_BALANCE_SAMPLE_PATHS)
+    percentiles: List[Annotated[float, Field(ge=0, le=100)]] = Field([5, 25, 50, 75, 95], min_length=1)
+
+class MonteCarloRequest(BaseModel):
+    config: ScenarioConfig
+    settings: MonteCarloSettings = MonteCarloSettings()
@@ -0,0 +1,142 @@
+import numpy as np
+from typing import List, Dict, Any
+from .models import ScenarioConfig, MonteCarloSettings, RateModel
+from .batch import simulate_batch, EventMap
+
+# Rate-model time step: one month, in years
+DT = 1 / 12
+
+
+def reset_months(settings: MonteCarloSettings, total_months: int) -> List[int]:
+    """
+    Months at which the simulated rate is applied (and the payment re-amortised).
+    """
+    return list(range(settings.first_reset_month, total_months * 2 + 1, settings.reset_every_months))
+
+
+def simulate_rate_paths(model: RateModel, start_rate: float, months: List[int], num_paths: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Steps the short-rate model monthly from start_rate and samples it at
+    the given months. Returns a (paths x len(months)) matrix of rates in %.
+
+    random_walk: dr = sigma dW
+    vasicek:     dr = kappa (theta - r) dt + sigma dW
+    cir:         dr = kappa (theta - r) dt + sigma sqrt(r) dW
+    Rates are floored at model.min_rate after every step.
+    """
+    if not months:
+        return np.empty((num_paths, 0))
+
+    theta = start_rate if model.long_run_rate is None else model.long_run_rate
+    rate = np.full(num_paths, float(start_rate))
+    sampled = np.empty((num_paths, len(months)))
+    wanted = {month: i for i, month in enumerate(months)}
+
+    for month in range(2, months[-1] + 1):
+        shock = rng.standard_normal(num_paths) * np.sqrt(DT)
+        if model.kind == "random_walk":
+            rate = rate + model.volatility * shock
+        elif model.kind == "vasicek":
+            rate = rate + model.mean_reversion * (theta - rate) * DT + model.volatility * shock
+        else:
+            rate = rate + model.mean_reversion * (theta - rate) * DT + model.volatility * np.sqrt(np.maximum(rate, 0)) * shock
+        rate = np.maximum(rate, model.min_rate)
+        if month in wanted:
+            sampled[:, wanted[month]] = rate
+
+    # A reset in month 1 (or earlier) just uses the starting rate
+    for month, i in wanted.items():
+        if month < 2:
+            sampled[:, i] = start_rate
+
+    return sampled
+
+
+def _percentiles(values: np.ndarray, percentiles: List[float]) -> Dict[str, float]:
+    summary = {"mean": float(values.mean()) if len(values) else 0.0}
+    if len(values):
+        for p, v in zip(percentiles, np.percentile(values, percentiles)):
+            summary[f"p{p:g}"] = float(v)
+    return summary
+
+
+def run_monte_carlo(config: ScenarioConfig, settings: MonteCarloSettings) -> Dict[str, Any]:
+    """
+    Simulates settings.paths stochastic rate paths for the config's loan.
+
+    The rate is re-drawn from the short-rate model at first_reset_month and
+    every reset_every_months after, re-amortising the payment each time,
+    with the same rules (and the config's overpayments and analysis window)
+    as calculate_mortgage. The config's own rate_changes are not used.
+
+    Paths run through the batch engine chunk_size at a time, so memory is
+    bounded by the chunk size: summary metrics are kept for every path, and
+    the balance-by-month bands come from the first balance_sample_paths
+    paths (which, being independent draws, are a random sample).
+    """
+    loan = config.base_loan
+    window = config.analysis_settings
+    total_months = loan.years * 12
+    resets = reset_months(settings, total_months)
+    rng = np.random.default_rng(settings.seed)
+
+    window_interest = []
+    lifetime_interest = []
+    balance_at_window_end = []
+    balance_sample: List[np.ndarray] = []
+    sampled = 0
+
+    for start in range(0, settings.paths, settings.chunk_size):
+        n = min(settings.chunk_size, settings.paths - start)
+        rows = np.arange(n)
+        rates = simulate_rate_paths(settings.rate_model, loan.start_rate, resets, n, rng)
+
+        rate_events: EventMap = {month: (rows, rates[:, i]) for i, month in enumerate(resets)}
+        overpayment_events: EventMap = {
+            item.month: (rows, np.full(n, item.amount))
+            for item in config.overpayments
+        }
+
+        record = sampled < settings.balance_sample_paths
+        raw = simulate_batch(
+            np.full(n, loan.principal),
+            np.full(n, loan.start_rate),
+            np.full(n, loan.years, dtype=np.int64),
+            np.full(n, window.window_start_month if window else 1),
+            np.full(n, window.window_end_month if window else 12),
+            rate_events,
+            overpayment_events,
+            record_balance=record,
+        )
+
+        window_interest.append(raw["window_interest"])
+        lifetime_interest.append(raw["lifetime_interest"])
+        balance_at_window_end.append(raw["balance_at_window_end"])
+        if record:
+            take = min(n, settings.balance_sample_paths - sampled)
+            balance_sample.append(raw["end_balance"][:, :take])
+            sampled += take
+
+    result = {
+        "paths": settings.paths,
+        "window_interest": _percentiles(np.concatenate(window_interest) if window_interest else np.empty(0), settings.percentiles),
+        "lifetime_interest": _percentiles(np.concatenate(lifetime_interest) if lifetime_interest else np.empty(0), settings.percentiles),
+        "balance_at_window_end": _percentiles(np.concatenate(balance_at_window_end) if balance_at_window_end else np.empty(0), settings.percentiles),
+        "balance_sample_paths": sampled,
+    }
+
+    if balance_sample:
+        # Chunks stop at different months; extend each with its final balances
+        num_months = max(b.shape[0] for b in balance_sample)
+        padded = [
+            np.vstack([b, np.repeat(b[-1:], num_months - b.shape[0], axis=0)]) if b.shape[0] < num_months else b
+            for b in balance_sample
+        ]
+        balances = np.hstack(padded)
+        bands = np.percentile(balances, settings.percentiles, axis=1)
+        result["balance_by_month"] = {
+            "month": list(range(1, num_months + 1)),
+            **{f"p{p:g}": band.tolist() for p, band in zip(settings.percentiles, bands)},
+        }
+
+    return result
@@ -0,0 +1,228 @@
+"""
+Portfolio mode: aggregate cash flows of a whole book of loans.
+
+Loans are read from CSV or Parquet one chunk at a time, each chunk is
+simulated with the batch engine and reduced to per-month totals plus a few
+per-loan figures, so memory depends on the chunk size rather than on the
+size of the book. No schedules are kept.
+
+One row per loan. Required columns: principal, start_rate, years.
+Optional: loan_id, window_start_month, window_end_month (default 1 / 12,
+as for a scenario without analysis settings), and rate_changes /
+overpayments written as "month:value" pairs separated by semicolons,
+e.g. "13:3.3;25:3.0".
+"""
+import csv
+import os
+from concurrent.futures import Future
+from collections import deque
+from typing import List, Dict, Any, Iterator, Optional, Sequence
+
+import numpy as np
+
+from .batch import simulate_batch, build_event_map, TOTAL_COLUMNS
+from .executors import get_pool, default_executor, default_workers
+from .metrics import metrics
+
+REQUIRED_COLUMNS = ("principal", "start_rate", "years")
+
+# Loans simulated together; one chunk's (months x loans) state stays small
+PORTFOLIO_CHUNK_SIZE = 10000
+
+DEFAULT_PERCENTILES = [5, 25, 50, 75, 95]
+
+
+def parse_events(text: Optional[str]) -> Dict[int, float]:
+    """
+    Parses "13:3.3;25:3.0" into {13: 3.3, 25: 3.0}. Empty means no events.
+    """
+    events: Dict[int, float] = {}
+    if not text:
+        return events
+    for pair in str(text).split(";"):
+        pair = pair.strip()
+        if not pair:
+            continue
+        month, sep, value = pair.partition(":")
+        if not sep:
+            raise ValueError(f"Expected month:value, got {pair!r}")
+        events[int(month)] = float(value)
+    return events
+
+
+def _to_chunk(columns: Dict[str, Sequence[Any]]) -> Dict[str, Any]:
+    """
+    Raw column values of one chunk -> the arrays simulate_loan_chunk takes.
+    """
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise ValueError(f"Loan file is missing column(s): {', '.join(missing)}")
+    n = len(columns["principal"])
+
+    def optional(name: str, default: int) -> np.ndarray:
+        values = columns.get(name)
+        if values is None:
+            return np.full(n, default, dtype=np.int64)
+        return np.array([default if v in (None, "") else int(v) for v in values], dtype=np.int64)
+
+    return {
+        "principal": np.array(columns["principal"], dtype=float),
+        "start_rate": np.array(columns["start_rate"], dtype=float),
+        "years": np.array(columns["years"], dtype=float).astype(np.int64),
+        "window_start": optional("window_start_month", 1),
+        "window_end": optional("window_end_month", 12),
+        "rate_changes": [parse_events(v) for v in columns.get("rate_changes", [None] * n)],
+        "overpayments": [parse_events(v) for v in columns.get("overpayments", [None] * n)],
+    }
+
+
+def read_loans_csv(path: str, chunk_size: int = PORTFOLIO_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader, [])]
+        while True:
+            rows = [row for _, row in zip(range(chunk_size), reader)]
+            if not rows:
+                return
+            yield _to_chunk({name: [row[i] for row in rows] for i, name in enumerate(header)})
+
+
+def read_loans_parquet(path: str, chunk_size: int = PORTFOLIO_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Reading Parquet needs pyarrow: pip install 'mortgage-calc[parquet]'") from e
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield _to_chunk(batch.to_pydict())
+
+
+def read_loans(path: str, chunk_size: int = PORTFOLIO_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the loans of a .csv or .parquet file chunk_size at a time.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return read_loans_csv(path, chunk_size)
+    if extension in (".parquet", ".pq"):
+        return read_loans_parquet(path, chunk_size)
+    raise ValueError(f"Unsupported loan file {path!r}; expected .csv or .parquet")
+
+
+def simulate_loan_chunk(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Worker entry point: simulates one chunk and reduces it to its monthly
+    totals and per-loan summary arrays.
+    """
+    with metrics.timed("simulation"):
+        raw = simulate_batch(
+            chunk["principal"], chunk["start_rate"], chunk["years"],
+            chunk["window_start"], chunk["window_end"],
+            build_event_map(chunk["rate_changes"]), build_event_map(chunk["overpayments"]),
+            record_totals=True,
+        )
+    metrics.inc("scenarios_simulated", len(chunk["principal"]))
+    metrics.inc("months_simulated", int(raw["end_month"].sum()))
+
+    return {
+        "loans": len(chunk["principal"]),
+        "principal": float(chunk["principal"].sum()),
+        "monthly_totals": raw["monthly_totals"],
+        "lifetime_interest": raw["lifetime_interest"],
+        "window_interest": raw["window_interest"],
+        "months": raw["months_active"],
+    }
+
+
+class PortfolioTotals:
+    """
+    Running reduction of simulate_loan_chunk outputs. Monthly totals are
+    summed as chunks arrive (in any order); the per-loan arrays are kept
+    only for the distributions.
+    """
+
+    def __init__(self):
+        self.loans = 0
+        self.principal = 0.0
+        self.monthly = {name: np.zeros(0, dtype=np.int64 if name in ("Month", "Loans Active") else float) for name in TOTAL_COLUMNS}
+        self._per_loan: Dict[str, List[np.ndarray]] = {"lifetime_interest": [], "window_interest": [], "months": []}
+
+    def add(self, partial: Dict[str, Any]):
+        self.loans += partial["loans"]
+        self.principal += partial["principal"]
+        chunk_totals = partial["monthly_totals"]
+        months = len(chunk_totals["Month"])
+        if months > len(self.monthly["Month"]):
+            for name, values in self.monthly.items():
+                self.monthly[name] = np.concatenate([values, np.zeros(months - len(values), dtype=values.dtype)])
+            self.monthly["Month"] = np.arange(1, months + 1)
+        for name in TOTAL_COLUMNS[1:]:
+            self.monthly[name][:months] += chunk_totals[name]
+        for name, values in self._per_loan.items():
+            values.append(partial[name])
+
+    def result(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+        distributions = {}
+        for name, parts in self._per_loan.items():
+            values = np.concatenate(parts) if parts else np.empty(0)
+            summary = {"mean": float(values.mean()) if len(values) else 0.0}
+            if len(values):
+                for p, v in zip(percentiles, np.percentile(values, percentiles)):
+                    summary[f"p{p:g}"] = float(v)
+            distributions[name] = summary
+
+        return {
+            "loans": self.loans,
+            "principal": self.principal,
+            "lifetime_interest": float(self.monthly["Interest Paid"].sum()),
+            "monthly_totals": {name: values.tolist() for name, values in self.monthly.items()},
+            "distributions": distributions,
+        }
+
+
+def run_portfolio(
+    path: str,
+    chunk_size: int = PORTFOLIO_CHUNK_SIZE,
+    executor: Optional[str] = None,
+    workers: Optional[int] = None,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+) -> Dict[str, Any]:
+    """
+    Simulates every loan in the file and returns the book's per-month totals
+    (loans running, payments, interest, principal, overpayments and end
+    balance) and the distributions across loans of lifetime interest, window
+    interest and months to payoff.
+
+    With a thread or process executor, chunks are simulated in parallel;
+    at most two chunks per worker are in flight, so the file is still read
+    incrementally.
+    """
+    kind = executor or default_executor()
+    workers = workers or default_workers()
+    pool = get_pool(kind, workers)
+    totals = PortfolioTotals()
+
+    if pool is None:
+        for chunk in read_loans(path, chunk_size):
+            totals.add(simulate_loan_chunk(chunk))
+        return totals.result(percentiles)
+
+    pending: "deque[Future]" = deque()
+    for chunk in read_loans(path, chunk_size):
+        if len(pending) >= workers * 2:
+            totals.add(pending.popleft().result())
+        pending.append(pool.submit(simulate_loan_chunk, chunk))
+    while pending:
+        totals.add(pending.popleft().result())
+    return totals.result(percentiles)
+
+
+def write_monthly_totals_csv(result: Dict[str, Any], path: str):
+    """
+    Writes run_portfolio's monthly totals, one row per month.
+    """
+    monthly = result["monthly_totals"]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(TOTAL_COLUMNS)
+        writer.writerows(zip(*(monthly[name] for name in TOTAL_COLUMNS)))
@@ -1,74 +1,319 @@
+import csv
 import os
-import pandas as pd
-from typing import List, Dict, Any
+import tempfile
+import numpy as np
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple
+from .models import SingleScenario
+from .schedule import Schedule, SCHEDULE_COLUMNS
+from .executors import run_scenarios
+from .metrics import metrics
 
-def export_reports(results: List[Dict[str, Any]], output_dir: str):
+# Characters Excel does not allow in sheet names
+INVALID_SHEET_CHARS = ['[', ']', ':', '*', '?', '/', '\\']
+
+EXPORT_FORMATS = ("csv", "excel", "parquet")
+
+CSV_FILE = "mortgage_schedule.csv"
+EXCEL_FILE = "scenario_comparison.xlsx"
+PARQUET_FILE = "scenario_schedules.parquet"
+
+# Scenarios simulated per step by stream_reports
+EXPORT_CHUNK_SIZE = 256
+
+
+def sheet_name(name: str) -> str:
+    """
+    Shortens a scenario name to a valid Excel sheet name.
+    """
+    sheet = name.replace("Scenario -> ", "").replace("Rate ", "").replace("%", "")[:30]
+    for ch in INVALID_SHEET_CHARS:
+        sheet = sheet.replace(ch, '')
+    return sheet
+
+
+class RateRange:
+    """
+    Running min and max rate per month over the schedules added so far.
+    Memory is one pair of floats per month, however many schedules there are.
+    """
+
+    def __init__(self):
+        self.low = np.empty(0)
+        self.high = np.empty(0)
+
+    def add(self, schedule: Schedule):
+        if not len(schedule):
+            return
+        months = schedule["Month"].astype(np.int64)
+        rates = schedule["Rate (%)"]
+        size = int(months.max()) + 1
+        if size > len(self.low):
+            self.low = np.concatenate([self.low, np.full(size - len(self.low), np.inf)])
+            self.high = np.concatenate([self.high, np.full(size - len(self.high), -np.inf)])
+        np.minimum.at(self.low, months, rates)
+        np.maximum.at(self.high, months, rates)
+
+    def differing_months(self) -> Optional[Tuple[int, int]]:
+        diff = np.flatnonzero(self.high > self.low)
+        if not len(diff):
+            return None
+        return int(diff[0]), int(diff[-1])
+
+
+def differing_months(schedules: Iterable[Schedule]) -> Optional[Tuple[int, int]]:
+    """
+    First and last month in which at least two schedules have different
+    rates, or None if every schedule agrees wherever they overlap.
+
+    One pass over the schedules keeps a running min and max rate per month,
+    so the cost is linear in the total number of schedule rows rather than
+    one outer merge per scenario.
+    """
+    rate_range = RateRange()
+    for schedule in schedules:
+        rate_range.add(schedule)
+    return rate_range.differing_months()
+
+
+def write_schedule_csv(schedule: Schedule, path: str):
+    """
+    Writes one schedule as CSV, with the presented (rounded) rows.
+    """
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(SCHEDULE_COLUMNS)
+        writer.writerows(schedule.iter_rows())
+
+
+class ScheduleSpool:
+    """
+    Schedules parked in an anonymous temporary file until the export knows
+    what to write (the Excel month range needs every scenario first).
+    Like the name -> schedule dict of export_reports, a repeated name keeps
+    its first position and its last schedule.
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self._positions: Dict[str, int] = {}
+
+    def add(self, name: str, schedule: Schedule):
+        self._positions[name] = self._file.tell()
+        np.save(self._file, np.vstack([schedule.columns[c] for c in SCHEDULE_COLUMNS]))
+
+    def __iter__(self):
+        for name, position in self._positions.items():
+            self._file.seek(position)
+            matrix = np.load(self._file)
+            columns = dict(zip(SCHEDULE_COLUMNS, matrix))
+            columns["Month"] = columns["Month"].astype(np.int64)
+            yield name, Schedule(columns)
+
+    def close(self):
+        self._file.close()
+
+
+class ExcelComparisonWriter:
+    """
+    Workbook with one sheet per scenario, written with openpyxl's write-only
+    mode: each sheet is streamed to a temporary file as rows are appended,
+    so memory does not grow with the number of sheets.
+    """
+
+    def __init__(self, path: str):
+        from openpyxl import Workbook
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+
+    def add(self, name: str, schedule: Schedule):
+        sheet = self.workbook.create_sheet(sheet_name(name))
+        sheet.append(SCHEDULE_COLUMNS)
+        for row in schedule.iter_rows():
+            sheet.append(row)
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+class ParquetScheduleWriter:
     """
-    Generates CSV for cheapest scenario and Excel for comparison.
+    Every scenario's schedule in one Parquet file, with a "Scenario" name
+    column and one row group per scenario. Needs pyarrow (the "parquet" extra).
     """
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet export needs pyarrow: pip install 'mortgage-calc[parquet]'") from e
+        self._pa = pa
+        self.path = path
+        self.schema = pa.schema(
+            [("Scenario", pa.string()), ("Month", pa.int64())]
+            + [(name, pa.float64()) for name in SCHEDULE_COLUMNS[1:]]
+        )
+        self._writer = pq.ParquetWriter(path, self.schema)
+
+    def add(self, name: str, schedule: Schedule):
+        columns = schedule.rounded()
+        arrays = [self._pa.array([name] * len(schedule), self._pa.string())]
+        arrays += [self._pa.array(columns[c]) for c in SCHEDULE_COLUMNS]
+        table = self._pa.Table.from_arrays(arrays, schema=self.schema)
+        self._writer.write_table(table, row_group_size=max(len(schedule), 1))
+
+    def close(self):
+        self._writer.close()
+
+
+def _check_formats(formats: Sequence[str]):
+    unknown = [f for f in formats if f not in EXPORT_FORMATS]
+    if unknown:
+        raise ValueError(f"formats must be among {', '.join(EXPORT_FORMATS)}, got {', '.join(unknown)}")
+
+
+def _report_diff_range(diff_range: Optional[Tuple[int, int]]) -> bool:
+    if diff_range is None:
+        print(f"[{'Excel Export':^20}] No rate differences found. Skipping.")
+        return False
+    min_month, max_month = diff_range
+    print(f"[{'Excel Export':^20}] Differing Period: Month {min_month} to {max_month}. Exporting...")
+    return True
+
+
+def export_reports(results: List[Dict[str, Any]], output_dir: str, formats: Sequence[str] = ("csv", "excel")):
+    """
+    Generates CSV for cheapest scenario and Excel for comparison
+    (and, with "parquet" in formats, every schedule as Parquet).
+    """
+    with metrics.timed("export"):
+        _export_reports(results, output_dir, formats)
+
+
+def _export_reports(results: List[Dict[str, Any]], output_dir: str, formats: Sequence[str]):
+    _check_formats(formats)
     if not results:
         print("No results to export.")
         return
 
     sorted_by_total_int = sorted(results, key=lambda x: x['lifetime_interest'])
     cheapest = sorted_by_total_int[0]
-    
+
     # Ensure output dir exists
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
     # CSV Export
-    if 'schedule' in cheapest:
-        df_cheapest = pd.DataFrame(cheapest['schedule'])
-        csv_path = os.path.join(output_dir, "mortgage_schedule.csv")
-        df_cheapest.to_csv(csv_path, index=False)
+    if "csv" in formats and 'schedule' in cheapest:
+        csv_path = os.path.join(output_dir, CSV_FILE)
+        write_schedule_csv(cheapest['schedule'], csv_path)
         print(f"[{'CSV Export':^20}] Saved to {csv_path}")
 
-    # Excel Comparison
     # Filter out results that don't have schedules
-    all_schedules = {r['name']: pd.DataFrame(r['schedule']) for r in results if 'schedule' in r}
-    
-    if not all_schedules:
-        return
+    schedules = {r['name']: r['schedule'] for r in results if 'schedule' in r}
 
-    merged = None
-    for name, df in all_schedules.items():
-        if df.empty: continue
-        temp = df[['Month', 'Rate (%)']].copy()
-        temp.columns = ['Month', f'Rate_{name}']
-        if merged is None:
-            merged = temp
-        else:
-            merged = pd.merge(merged, temp, on='Month', how='outer')
-            
-    if merged is None:
+    if not schedules:
         return
 
-    rate_cols = [c for c in merged.columns if c.startswith('Rate_')]
-    if not rate_cols:
-        return
+    if "parquet" in formats:
+        parquet_path = os.path.join(output_dir, PARQUET_FILE)
+        writer = ParquetScheduleWriter(parquet_path)
+        for name, schedule in schedules.items():
+            writer.add(name, schedule)
+        writer.close()
+        print(f"[{'Parquet Export':^20}] Saved to {parquet_path}")
 
-    merged['diff'] = merged[rate_cols].max(axis=1) != merged[rate_cols].min(axis=1)
-    diff_months = merged[merged['diff']]['Month'].tolist()
-    
-    excel_path = os.path.join(output_dir, "scenario_comparison.xlsx")
-    
-    if not diff_months:
-        print(f"[{'Excel Export':^20}] No rate differences found. Skipping.")
-    else:
-        min_month = min(diff_months)
-        max_month = max(diff_months)
-        print(f"[{'Excel Export':^20}] Differing Period: Month {min_month} to {max_month}. Exporting...")
-        
-        with pd.ExcelWriter(excel_path) as writer:
-            for name, df in all_schedules.items():
-                mask = (df['Month'] >= min_month) & (df['Month'] <= max_month)
-                filtered_df = df[mask]
-                
-                sheet_name = name.replace("Scenario -> ", "").replace("Rate ", "").replace("%", "")[:30]
-                # invalid chars
-                for ch in ['[', ']', ':', '*', '?', '/', '\\']:
-                    sheet_name = sheet_name.replace(ch, '')
-                
-                filtered_df.to_excel(writer, sheet_name=sheet_name, index=False)
-        print(f"[{'Excel Export':^20}] Saved to {excel_path}")
+    # Excel Comparison
+    if "excel" in formats:
+        diff_range = differing_months(schedules.values())
+        if _report_diff_range(diff_range):
+            excel_path = os.path.join(output_dir, EXCEL_FILE)
+            writer = ExcelComparisonWriter(excel_path)
+            for name, schedule in schedules.items():
+                writer.add(name, schedule.months(*diff_range))
+            writer.close()
+            print(f"[{'Excel Export':^20}] Saved to {excel_path}")
+
+
+def stream_reports(
+    scenarios: Sequence[SingleScenario],
+    output_dir: str,
+    formats: Sequence[str] = ("csv", "excel"),
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+    executor: Optional[str] = None,
+    workers: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    export_reports for a sequence of scenarios (e.g. a ScenarioSpace) that
+    simulates them chunk_size at a time, so peak memory does not depend on
+    the number of scenarios.
+
+    Each scenario is simulated once. The cheapest schedule is kept for the
+    CSV; for Excel and Parquet, schedules go to a ScheduleSpool on disk and
+    are written once the differing-rate period is known.
+    Returns the cheapest scenario's summary (None if there are no scenarios).
+    """
+    with metrics.timed("export"):
+        return _stream_reports(scenarios, output_dir, formats, chunk_size, executor, workers)
+
+
+def _stream_reports(
+    scenarios: Sequence[SingleScenario],
+    output_dir: str,
+    formats: Sequence[str],
+    chunk_size: int,
+    executor: Optional[str],
+    workers: Optional[int],
+) -> Optional[Dict[str, Any]]:
+    _check_formats(formats)
+    if not len(scenarios):
+        print("No results to export.")
+        return None
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    spool = ScheduleSpool() if "excel" in formats or "parquet" in formats else None
+    cheapest: Optional[Dict[str, Any]] = None
+    cheapest_schedule = None
+    rate_range = RateRange()
+    try:
+        for start in range(0, len(scenarios), chunk_size):
+            chunk = scenarios[start:start + chunk_size]
+            for res in run_scenarios(chunk, return_schedule=True, executor=executor, workers=workers):
+                if cheapest is None or res['lifetime_interest'] < cheapest['lifetime_interest']:
+                    cheapest = {k: v for k, v in res.items() if k != 'schedule'}
+                    cheapest_schedule = res['schedule']
+                rate_range.add(res['schedule'])
+                if spool is not None:
+                    spool.add(res['name'], res['schedule'])
+
+        if "csv" in formats:
+            csv_path = os.path.join(output_dir, CSV_FILE)
+            write_schedule_csv(cheapest_schedule, csv_path)
+            print(f"[{'CSV Export':^20}] Saved to {csv_path}")
+
+        writers: Dict[str, Any] = {}
+        diff_range = None
+        if "parquet" in formats:
+            writers["parquet"] = ParquetScheduleWriter(os.path.join(output_dir, PARQUET_FILE))
+        if "excel" in formats:
+            diff_range = rate_range.differing_months()
+            if _report_diff_range(diff_range):
+                writers["excel"] = ExcelComparisonWriter(os.path.join(output_dir, EXCEL_FILE))
+
+        if writers:
+            for name, schedule in spool:
+                if "parquet" in writers:
+                    writers["parquet"].add(name, schedule)
+                if "excel" in writers:
+                    writers["excel"].add(name, schedule.months(*diff_range))
+            for kind, writer in writers.items():
+                writer.close()
+                label = "Excel Export" if kind == "excel" else "Parquet Export"
+                print(f"[{label:^20}] Saved to {writer.path}")
+    finally:
+        if spool is not None:
+            spool.close()
+
+    return cheapest
@@ -1,79 +1,248 @@
-import copy
-from typing import List
+from collections.abc import Sequence
+from typing import List, Dict, Any, Iterator, Optional, Union
+import numpy as np
 from .models import ScenarioConfig, SingleScenario, SingleRateChange
+from .compact import CompactScenario
+from .metrics import metrics
+
+def rate_options(config: ScenarioConfig) -> List[List[float]]:
+    """
+    The options of every rate change, in config order. A single rate is a
+    one-option list.
+    """
+    return [
+        list(change.new_rate) if isinstance(change.new_rate, list) else [change.new_rate]
+        for change in config.rate_changes
+    ]
+
+def branch_name(config: ScenarioConfig, choices: List[int]) -> str:
+    """
+    The name of the branch picking option choices[i] for the i-th rate change.
+    Only rate changes given as a list show up in the name.
+    """
+    name = "Scenario"
+    for change, choice in zip(config.rate_changes, choices):
+        if isinstance(change.new_rate, list):
+            name += f" -> {change.new_rate[choice]}% @ M{change.month}"
+    return name
+
+class ScenarioSpace(Sequence):
+    """
+    Lazy view over every branch of a config.
+
+    Scenario i is the mixed-radix number whose digits are the option picked
+    for each rate change (the first rate change being the most significant
+    digit), which is the order expand_scenarios has always produced.
+    Scenarios are only built when asked for, so len() and random access
+    work on spaces far too large to hold in memory.
+    """
+
+    def __init__(self, config: ScenarioConfig, indices: Optional[range] = None):
+        self.config = config
+        self.options = rate_options(config)
+
+        # Place value of each rate change's digit
+        self.strides = [1] * len(self.options)
+        for i in range(len(self.options) - 2, -1, -1):
+            self.strides[i] = self.strides[i + 1] * len(self.options[i + 1])
+        total = self.strides[0] * len(self.options[0]) if self.options else 1
+
+        self.indices = range(total) if indices is None else indices
+
+        # Shared by every compact scenario of the space
+        loan = config.base_loan
+        window = config.analysis_settings
+        self._loan = (loan.principal, loan.start_rate, loan.years)
+        self._window = (window.window_start_month, window.window_end_month) if window else (1, 12)
+        self._overpayments = dict(sorted({item.month: item.amount for item in config.overpayments}.items()))
+        self._months = [change.month for change in config.rate_changes]
+        # Name fragment of each option (None for single-rate changes, which
+        # do not show up in names)
+        self._labels = [
+            [f" -> {rate}% @ M{change.month}" for rate in options] if isinstance(change.new_rate, list) else None
+            for change, options in zip(config.rate_changes, self.options)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __iter__(self) -> Iterator[SingleScenario]:
+        for index in self.indices:
+            yield self._build(index)
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[SingleScenario, "ScenarioSpace"]:
+        if isinstance(item, slice):
+            return ScenarioSpace(self.config, self.indices[item])
+        return self._build(self.indices[item])
+
+    def choices_at(self, i: int) -> List[int]:
+        """
+        The option index picked for each rate change by scenario i.
+        """
+        index = self.indices[i]
+        return [(index // stride) % len(options) for stride, options in zip(self.strides, self.options)]
+
+    def name_at(self, i: int) -> str:
+        return branch_name(self.config, self.choices_at(i))
+
+    def scenario_at(self, i: int) -> SingleScenario:
+        return self._build(self.indices[i])
+
+    def compact_at(self, i: int) -> CompactScenario:
+        """
+        Scenario i as a CompactScenario, built without any pydantic models.
+        """
+        return self._build_compact(self.indices[i])
+
+    def iter_compact(self) -> Iterator[CompactScenario]:
+        for index in self.indices:
+            yield self._build_compact(index)
+
+    def batch_inputs(self) -> Dict[str, Any]:
+        """
+        batch.run_batch input for every scenario of this view, computed from
+        the index digits with NumPy instead of per scenario.
+        """
+        n = len(self.indices)
+        index = np.arange(self.indices.start, self.indices.stop, self.indices.step, dtype=np.int64)
+        rows = np.arange(n, dtype=np.intp)
+        names = np.full(n, "Scenario", dtype=object)
+
+        rate_events = {}
+        for month, options, labels, stride in zip(self._months, self.options, self._labels, self.strides):
+            choices = (index // stride) % len(options)
+            # A later rate change for the same month wins, as in the scenario's lookup
+            rate_events[month] = (rows, np.array(options, dtype=float)[choices])
+            if labels is not None:
+                names = names + np.array(labels, dtype=object)[choices]
+
+        principal, start_rate, years = self._loan
+        window_start, window_end = self._window
+        return {
+            "names": names.tolist(),
+            "principal": np.full(n, principal, dtype=float),
+            "start_rate": np.full(n, start_rate, dtype=float),
+            "years": np.full(n, years, dtype=np.int64),
+            "window_start": np.full(n, window_start, dtype=np.int64),
+            "window_end": np.full(n, window_end, dtype=np.int64),
+            "rate_events": rate_events,
+            "overpayment_events": {month: (rows, np.full(n, amount, dtype=float)) for month, amount in self._overpayments.items()},
+        }
+
+    def _build_compact(self, index: int) -> CompactScenario:
+        name = "Scenario"
+        rates = {}
+        for month, options, labels, stride in zip(self._months, self.options, self._labels, self.strides):
+            choice = (index // stride) % len(options)
+            rates[month] = options[choice]
+            if labels is not None:
+                name += labels[choice]
+        principal, start_rate, years = self._loan
+        window_start, window_end = self._window
+        return CompactScenario(
+            name, principal, start_rate, years, window_start, window_end,
+            dict(sorted(rates.items())), self._overpayments,
+        )
+
+    def _build(self, index: int) -> SingleScenario:
+        choices = [(index // stride) % len(options) for stride, options in zip(self.strides, self.options)]
+        return SingleScenario(
+            name=branch_name(self.config, choices),
+            loan_details=self.config.base_loan,
+            rate_changes=[
+                SingleRateChange(month=change.month, new_rate=options[choice])
+                for change, options, choice in zip(self.config.rate_changes, self.options, choices)
+            ],
+            overpayments=self.config.overpayments,
+            analysis_settings=self.config.analysis_settings
+        )
+
+class MultiScenarioSpace(Sequence):
+    """
+    Several ScenarioSpaces back to back, so the scenarios of many configs
+    can be chunked and simulated together. Slices (contiguous only) may
+    span configs; their batch_inputs joins the pieces' arrays.
+    """
+
+    def __init__(self, spaces: Sequence[ScenarioSpace]):
+        self.spaces = list(spaces)
+        # offsets[i] is the position of spaces[i]'s first scenario
+        self.offsets = [0]
+        for space in self.spaces:
+            self.offsets.append(self.offsets[-1] + len(space))
+
+    def __len__(self) -> int:
+        return self.offsets[-1]
+
+    def __iter__(self) -> Iterator[SingleScenario]:
+        for space in self.spaces:
+            yield from space
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[SingleScenario, "MultiScenarioSpace"]:
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step != 1:
+                raise ValueError("MultiScenarioSpace only supports contiguous slices")
+            return MultiScenarioSpace([
+                space[max(start - offset, 0):max(stop - offset, 0)]
+                for space, offset in zip(self.spaces, self.offsets)
+                if start < offset + len(space) and stop > offset
+            ])
+        space, i = self._locate(item)
+        return space[i]
+
+    def _locate(self, i: int):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("scenario index out of range")
+        for space, offset in zip(self.spaces, self.offsets[1:]):
+            if i < offset:
+                return space, i - (offset - len(space))
+
+    def group_sizes(self) -> List[int]:
+        return [len(space) for space in self.spaces]
+
+    def iter_compact(self) -> Iterator[CompactScenario]:
+        for space in self.spaces:
+            yield from space.iter_compact()
+
+    def batch_inputs(self) -> Dict[str, Any]:
+        parts = [space.batch_inputs() for space in self.spaces if len(space)]
+        if len(parts) == 1:
+            return parts[0]
+        inputs: Dict[str, Any] = {"names": [name for part in parts for name in part["names"]]}
+        for key in ("principal", "start_rate", "years", "window_start", "window_end"):
+            inputs[key] = np.concatenate([part[key] for part in parts]) if parts else np.empty(0)
+        for key in ("rate_events", "overpayment_events"):
+            rows_by_month: Dict[int, List[np.ndarray]] = {}
+            values_by_month: Dict[int, List[np.ndarray]] = {}
+            offset = 0
+            for part in parts:
+                for month, (rows, values) in part[key].items():
+                    rows_by_month.setdefault(month, []).append(rows + offset)
+                    values_by_month.setdefault(month, []).append(values)
+                offset += len(part["names"])
+            inputs[key] = {
+                month: (np.concatenate(rows), np.concatenate(values_by_month[month]))
+                for month, rows in rows_by_month.items()
+            }
+        return inputs
+
+def iter_scenarios(config: ScenarioConfig) -> Iterator[SingleScenario]:
+    """
+    Yields the expanded scenarios one at a time without building the list.
+    """
+    return iter(ScenarioSpace(config))
 
 def expand_scenarios(config: ScenarioConfig) -> List[SingleScenario]:
     """
     Parses the configuration and branches scenarios whenever a rate change
     has a list of options.
     Returns a list of complete scenario objects.
+    Use ScenarioSpace or iter_scenarios to avoid holding them all at once.
     """
-    # Create the base scenario structure
-    # Note: We need to convert from ScenarioConfig to SingleScenario structure
-    # But recursively handling the branching
-    
-    # We will use a dictionary-like approach for recursion simplicity, 
-    # then convert to objects at the end, or work with objects directly.
-    # Working with objects directly is safer.
-    
-    base_scenario = SingleScenario(
-        name="Base Scenario", # Will be updated
-        loan_details=config.base_loan,
-        rate_changes=[], 
-        overpayments=config.overpayments,
-        analysis_settings=config.analysis_settings
-    )
-
-    # We need the list of RateChange objects from the config
-    raw_rate_changes = config.rate_changes
-    
-    def build_branches(current_scenario: SingleScenario, remaining_changes) -> List[SingleScenario]:
-        if not remaining_changes:
-            return [current_scenario]
-        
-        next_change = remaining_changes[0]
-        rest_changes = remaining_changes[1:]
-        
-        branches = []
-        
-        # Check if next_change.new_rate is a list
-        if isinstance(next_change.new_rate, list):
-            # Branching
-            for rate_option in next_change.new_rate:
-                # Deepcopy current scenario
-                new_branch = current_scenario.model_copy(deep=True)
-                # Append the single event
-                new_branch.rate_changes.append(
-                    SingleRateChange(month=next_change.month, new_rate=rate_option)
-                )
-                # Update name
-                new_branch.name += f" -> {rate_option}% @ M{next_change.month}"
-                
-                branches.extend(build_branches(new_branch, rest_changes))
-        else:
-            # No branching
-            # We can modify current_scenario if we are sure it's a copy or just pass it along?
-            # Ideally we treat it immutably or careful copies.
-            # Since we come from a path where we might have branched, we should modify *this* branch's copy.
-            # But wait, if we are in the "else" block, we didn't fork *here*, 
-            # but we might be iterating inside a parent's loop.
-            # To be safe, we should probably append to the current object.
-            # However, if 'current_scenario' is reused (it is passed by reference), we must be careful.
-            # But in build_branches, 'current_scenario' is passed in.
-            
-            # Use model_copy to be safe if we are modifying it.
-            # Actually, let's just modify it if it's unique to this path.
-            # But Python references...
-            # Let's just blindly copy to be safe, optimization comes later.
-            current_scenario_copy = current_scenario.model_copy(deep=True)
-            
-            current_scenario_copy.rate_changes.append(
-                SingleRateChange(month=next_change.month, new_rate=next_change.new_rate)
-            )
-            branches.extend(build_branches(current_scenario_copy, rest_changes))
-            
-        return branches
-
-    base_scenario.name = "Scenario" 
-    expanded_scenarios = build_branches(base_scenario, raw_rate_changes)
-    return expanded_scenarios
+    with metrics.timed("expansion"):
+        scenarios = list(ScenarioSpace(config))
+    metrics.inc("scenarios_expanded", len(scenarios))
+    return scenarios
@@ -0,0 +1,180 @@
+import numpy as np
+from typing import List, Dict, Any, Iterator, Sequence, Optional
+
+# Column order of a schedule row
+SCHEDULE_COLUMNS = [
+    "Month",
+    "Rate (%)",
+    "Start Balance",
+    "Monthly Payment",
+    "Interest Paid",
+    "Principal Paid",
+    "Overpayment",
+    "End Balance",
+    "Cumulative Interest",
+    "Cumulative Principal",
+    "Total Paid To Date",
+]
+
+# Columns shown rounded to the cent
+MONEY_COLUMNS = SCHEDULE_COLUMNS[2:]
+
+# Columns the row dicts of the original loop held as the int 0 when there
+# was nothing to show: no overpayment that month, or the loan paid off
+INT_ZERO_COLUMNS = ("Overpayment", "End Balance")
+
+
+def round_cents(values: np.ndarray) -> np.ndarray:
+    """
+    Rounds to the cent exactly as Python's round(x, 2) does. np.round scales
+    by 100 first, which can tip values lying next to a half cent the other
+    way, so those few are rounded one by one.
+    """
+    scaled = values * 100
+    rounded = np.round(scaled) / 100
+    # Scaling errs by at most an ulp or so; only values that close to a half can differ
+    near_half = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) <= 8 * np.spacing(np.maximum(1.0, np.abs(scaled)))
+    for i in np.flatnonzero(near_half):
+        rounded[i] = round(float(values[i]), 2)
+    return rounded
+
+
+class Schedule:
+    """
+    Monthly schedule stored as one NumPy array per column.
+    Values are kept unrounded; rounding to the cent happens once, in the
+    to_records / to_pandas adapters, which present the same values and
+    types as the original per-row dicts.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[float]]) -> "Schedule":
+        """
+        Builds a schedule from row tuples in SCHEDULE_COLUMNS order.
+        """
+        if not rows:
+            return cls.empty()
+        matrix = np.array(rows, dtype=float)
+        columns = {name: matrix[:, i].copy() for i, name in enumerate(SCHEDULE_COLUMNS)}
+        columns["Month"] = columns["Month"].astype(np.int64)
+        return cls(columns)
+
+    @classmethod
+    def empty(cls) -> "Schedule":
+        columns = {name: np.empty(0) for name in SCHEDULE_COLUMNS}
+        columns["Month"] = np.empty(0, dtype=np.int64)
+        return cls(columns)
+
+    @classmethod
+    def concat(cls, parts: Sequence["Schedule"]) -> "Schedule":
+        """
+        Joins schedules covering consecutive month ranges.
+        """
+        if not parts:
+            return cls.empty()
+        return cls({name: np.concatenate([p.columns[name] for p in parts]) for name in SCHEDULE_COLUMNS})
+
+    def __len__(self) -> int:
+        return len(self.columns["Month"])
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Schedule):
+            return NotImplemented
+        return all(np.array_equal(self.columns[c], other.columns[c]) for c in SCHEDULE_COLUMNS)
+
+    def __repr__(self) -> str:
+        return f"Schedule({len(self)} months)"
+
+    @property
+    def nbytes(self) -> int:
+        return sum(values.nbytes for values in self.columns.values())
+
+    def rows(self, mask: Any) -> "Schedule":
+        """
+        Returns a new schedule keeping only the rows selected by mask
+        (a boolean array, index array or slice).
+        """
+        return Schedule({name: values[mask] for name, values in self.columns.items()})
+
+    def months(self, start: Optional[int] = None, end: Optional[int] = None) -> "Schedule":
+        """
+        Returns the rows for months start..end (inclusive).
+        """
+        month = self.columns["Month"]
+        mask = np.ones(len(month), dtype=bool)
+        if start is not None:
+            mask &= month >= start
+        if end is not None:
+            mask &= month <= end
+        return self.rows(mask)
+
+    def select(self, start: Optional[int] = None, end: Optional[int] = None, every: int = 1) -> "Schedule":
+        """
+        Rows for months start..end (inclusive), keeping every Nth row of that range.
+        """
+        selected = self.months(start, end)
+        return selected if every == 1 else selected.rows(slice(None, None, every))
+
+    def rounded(self) -> Dict[str, np.ndarray]:
+        """
+        The columns as presented: money columns rounded to the cent.
+        """
+        return {
+            name: round_cents(values) if name in MONEY_COLUMNS else values
+            for name, values in self.columns.items()
+        }
+
+    def presented(self, uniform: bool = False) -> Dict[str, List[Any]]:
+        """
+        The presented columns as lists of Python numbers, typed like the
+        original rows: the int 0 in INT_ZERO_COLUMNS where nothing happened.
+        With uniform (for tables, where a column has one type), such a column
+        is all ints if every value is whole, as when the original script's
+        table was built from the config's whole overpayment amounts, and all
+        floats otherwise.
+        """
+        rounded = self.rounded()
+        columns = {name: rounded[name].tolist() for name in SCHEDULE_COLUMNS}
+        for name in INT_ZERO_COLUMNS:
+            values = self.columns[name]
+            if uniform:
+                if np.array_equal(values, np.trunc(values)):
+                    columns[name] = [int(v) for v in columns[name]]
+            else:
+                for i in np.flatnonzero(values == 0):
+                    columns[name][i] = 0
+        return columns
+
+    def iter_rows(self) -> Iterator[List[Any]]:
+        """
+        Yields presented rows as tuples in SCHEDULE_COLUMNS order, typed
+        per column (as CSV and Excel exports show them).
+        """
+        columns = self.presented(uniform=True)
+        return zip(*(columns[name] for name in SCHEDULE_COLUMNS))
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """
+        The schedule as a list of row dicts (the JSON shape of the API).
+        """
+        columns = self.presented()
+        return [dict(zip(SCHEDULE_COLUMNS, row)) for row in zip(*(columns[name] for name in SCHEDULE_COLUMNS))]
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """
+        The schedule as one list per column (the API's columnar JSON shape).
+        """
+        return self.presented()
+
+    def to_pandas(self):
+        """
+        The schedule as a DataFrame with one column per schedule field.
+        """
+        import pandas as pd
+        return pd.DataFrame(self.presented(uniform=True), columns=SCHEDULE_COLUMNS)
@@ -0,0 +1,105 @@
+import heapq
+import itertools
+from typing import List, Dict, Any, Tuple
+from .models import ScenarioConfig
+from .calculation import MortgageState, run_months, run_segments, calculate_mortgage
+from .scenarios import ScenarioSpace, rate_options, branch_name
+from .tree import branch_groups
+
+# Metrics that can only grow when any rate on the path grows, which is what
+# makes the cheapest-remaining-option bound a valid lower bound.
+RANKABLE_METRICS = ("lifetime_interest", "window_interest")
+
+# Closed-form bounds agree with month-by-month stepping to within a cent;
+# subtracting this keeps them strictly below the exact leaf values.
+BOUND_SLACK = 0.01
+
+
+def _metric(state: MortgageState, metric: str) -> float:
+    return state.result("")[metric]
+
+
+def top_k(config: ScenarioConfig, k: int, metric: str = "lifetime_interest", return_schedule: bool = False) -> List[Dict[str, Any]]:
+    """
+    Finds the k cheapest branches of config by metric without simulating
+    every branch.
+
+    The branch tree is searched best-first. Each partial branch is scored
+    with a lower bound: the loan is run from its checkpoint to the end
+    taking the cheapest option at every remaining branch point. Interest
+    only grows with the rate, so no branch below a node can beat that bound
+    and subtrees whose bound is worse than the k-th result are never expanded.
+
+    Returns up to k result dicts (as from calculate_mortgage) in ascending
+    metric order, each with the branch's ScenarioSpace "index".
+    """
+    if metric not in RANKABLE_METRICS:
+        raise ValueError(f"metric must be one of {', '.join(RANKABLE_METRICS)}, got {metric!r}")
+    if k <= 0:
+        return []
+
+    options = rate_options(config)
+    groups = branch_groups(config)
+    space = ScenarioSpace(config)
+    overpayments_map = {item.month: item.amount for item in config.overpayments}
+
+    # The rate that takes effect at each group month is the last member's
+    cheapest_rates = [min(options[members[-1]]) if options[members[-1]] else None for _, members in groups]
+
+    def lower_bound(state: MortgageState, group_index: int) -> float:
+        if state.finished or (metric == "window_interest" and state.month > state.window_end):
+            # Nothing left that can change the metric
+            return _metric(state, metric)
+        remaining = {
+            month: rate
+            for (month, _), rate in zip(groups[group_index:], cheapest_rates[group_index:])
+            if rate is not None
+        }
+        return _metric(run_segments(state.copy(), remaining, overpayments_map), metric) - BOUND_SLACK
+
+    counter = itertools.count()
+    root = MortgageState(config.base_loan, config.analysis_settings)
+    run_months(root, {}, overpayments_map, stop_month=groups[0][0] if groups else None)
+    # Entries are (bound, -depth, tie-breaker, depth, state, choices); among
+    # equal bounds the deepest node goes first, so ties resolve depth-first
+    # instead of opening every sibling.
+    frontier: List[Tuple[float, int, int, int, MortgageState, Tuple[int, ...]]] = []
+    if groups:
+        heapq.heappush(frontier, (lower_bound(root, 0), 0, next(counter), 0, root, (0,) * len(options)))
+    else:
+        run_months(root, {}, overpayments_map)
+        heapq.heappush(frontier, (_metric(root, metric), 0, next(counter), 0, root, ()))
+
+    results = []
+    while frontier and len(results) < k:
+        _, _, _, group_index, state, choices = heapq.heappop(frontier)
+
+        if group_index == len(groups):
+            # A leaf: its bound is the exact metric, and every other node's
+            # bound is at least as large, so it is the next best branch.
+            index = sum(c * s for c, s in zip(choices, space.strides))
+            result = state.result(branch_name(config, list(choices)))
+            result["index"] = index
+            results.append(result)
+            continue
+
+        month, members = groups[group_index]
+        next_month = groups[group_index + 1][0] if group_index + 1 < len(groups) else None
+        for combo in itertools.product(*(range(len(options[m])) for m in members)):
+            child = state.copy()
+            child_choices = list(choices)
+            for member, choice in zip(members, combo):
+                child_choices[member] = choice
+            effective_rate = options[members[-1]][combo[-1]]
+            run_months(child, {month: effective_rate}, overpayments_map, stop_month=next_month)
+
+            child_index = group_index + 1
+            child_bound = _metric(child, metric) if child_index == len(groups) else lower_bound(child, child_index)
+            heapq.heappush(frontier, (child_bound, -child_index, next(counter), child_index, child, tuple(child_choices)))
+
+    if return_schedule:
+        for result in results:
+            scenario = space.compact_at(result["index"])
+            result["schedule"] = calculate_mortgage(scenario, return_schedule=True)["schedule"]
+
+    return results
@@ -0,0 +1,250 @@
+"""
+Sharded runs over a config's scenario space.
+
+A shard is an index range start..stop of the ScenarioSpace, so any process
+or machine holding the same config can run any shard. A shard keeps only a
+partial result: the top-K scenarios by each metric and per-metric running
+statistics. Partials are plain JSON and merge in any order into the result
+of the whole space; run_sharded does the same with local processes.
+"""
+import hashlib
+import heapq
+import json
+import os
+from typing import List, Dict, Any, Optional, Sequence
+
+from .models import ScenarioConfig
+from .scenarios import ScenarioSpace
+from .executors import simulate_chunk, get_pool, default_workers
+from .calculation import calculate_mortgage
+
+# Metrics kept per shard (lower is better for all of them)
+SHARD_METRICS = ("lifetime_interest", "window_interest", "balance_at_window_end")
+
+SUMMARY_FIELDS = ("window_interest", "window_principal", "balance_at_window_end", "lifetime_interest")
+
+DEFAULT_TOP_K = 10
+
+# Scenarios simulated per batch inside a shard
+SHARD_CHUNK_SIZE = 2000
+
+
+def config_fingerprint(config: ScenarioConfig) -> str:
+    """
+    Hash of the config, stored in every partial so that partials of
+    different configs are never merged.
+    """
+    return hashlib.sha256(config.model_dump_json().encode()).hexdigest()[:16]
+
+
+def shard_ranges(total: int, num_shards: int) -> List[range]:
+    """
+    Splits 0..total into num_shards contiguous ranges whose sizes differ by
+    at most one.
+    """
+    if num_shards < 1:
+        raise ValueError(f"num_shards must be at least 1, got {num_shards}")
+    base, extra = divmod(total, num_shards)
+    ranges, start = [], 0
+    for shard in range(num_shards):
+        stop = start + base + (1 if shard < extra else 0)
+        ranges.append(range(start, stop))
+        start = stop
+    return ranges
+
+
+def _empty_stats() -> Dict[str, Any]:
+    # min / max stay None (JSON null) until a scenario is seen
+    return {"count": 0, "sum": 0.0, "sum_sq": 0.0, "min": None, "max": None}
+
+
+def _bound(pick, values) -> Optional[float]:
+    """
+    pick (min or max) of the values that are not None, or None if none are.
+    """
+    values = [v for v in values if v is not None]
+    return pick(values) if values else None
+
+
+def _rank_key(metric: str):
+    # Ties go to the lower index, so merged top-K lists are deterministic
+    return lambda r: (r[metric], r["index"])
+
+
+def run_shard(config: ScenarioConfig, start: int, stop: int, k: int = DEFAULT_TOP_K, chunk_size: int = SHARD_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Simulates scenarios start..stop-1 of config's ScenarioSpace in this
+    process and returns the shard's partial result.
+    """
+    space = ScenarioSpace(config)
+    stop = min(stop, len(space))
+    top: Dict[str, List[Dict[str, Any]]] = {metric: [] for metric in SHARD_METRICS}
+    stats = {field: _empty_stats() for field in SUMMARY_FIELDS}
+
+    for offset in range(start, stop, chunk_size):
+        results = simulate_chunk(space[offset:min(offset + chunk_size, stop)])
+        for i, r in enumerate(results, start=offset):
+            r["index"] = i
+        for field, s in stats.items():
+            values = [r[field] for r in results]
+            s["count"] += len(values)
+            s["sum"] += sum(values)
+            s["sum_sq"] += sum(v * v for v in values)
+            s["min"] = _bound(min, [s["min"], *values])
+            s["max"] = _bound(max, [s["max"], *values])
+        for metric in SHARD_METRICS:
+            top[metric] = heapq.nsmallest(k, top[metric] + results, key=_rank_key(metric))
+
+    return {
+        "config": config_fingerprint(config),
+        "total": len(space),
+        "ranges": [[start, stop]],
+        "k": k,
+        "top": top,
+        "stats": stats,
+    }
+
+
+def merge_partials(partials: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combines shard partials (or earlier merges) into one partial. Raises
+    ValueError if they come from different configs or overlap.
+    """
+    if not partials:
+        raise ValueError("Nothing to merge")
+    fingerprints = {p["config"] for p in partials}
+    if len(fingerprints) > 1:
+        raise ValueError(f"Partials come from different configs: {', '.join(sorted(fingerprints))}")
+
+    ranges = sorted(tuple(r) for p in partials for r in p["ranges"])
+    for (_, prev_stop), (start, _) in zip(ranges, ranges[1:]):
+        if start < prev_stop:
+            raise ValueError(f"Shards overlap at scenario {start}")
+
+    k = min(p["k"] for p in partials)
+    top = {
+        metric: heapq.nsmallest(k, [r for p in partials for r in p["top"][metric]], key=_rank_key(metric))
+        for metric in SHARD_METRICS
+    }
+    stats = {}
+    for field in SUMMARY_FIELDS:
+        parts = [p["stats"][field] for p in partials]
+        stats[field] = {
+            "count": sum(s["count"] for s in parts),
+            "sum": sum(s["sum"] for s in parts),
+            "sum_sq": sum(s["sum_sq"] for s in parts),
+            "min": _bound(min, [s["min"] for s in parts]),
+            "max": _bound(max, [s["max"] for s in parts]),
+        }
+
+    return {
+        "config": partials[0]["config"],
+        "total": partials[0]["total"],
+        "ranges": [list(r) for r in _coalesce(ranges)],
+        "k": k,
+        "top": top,
+        "stats": stats,
+    }
+
+
+def _coalesce(ranges: List[tuple]) -> List[tuple]:
+    merged: List[list] = []
+    for start, stop in ranges:
+        if merged and merged[-1][1] == start:
+            merged[-1][1] = stop
+        else:
+            merged.append([start, stop])
+    return [tuple(r) for r in merged]
+
+
+def missing_ranges(partial: Dict[str, Any]) -> List[List[int]]:
+    """
+    Index ranges of the space not covered by the partial yet.
+    """
+    missing, covered_to = [], 0
+    for start, stop in partial["ranges"]:
+        if start > covered_to:
+            missing.append([covered_to, start])
+        covered_to = max(covered_to, stop)
+    if covered_to < partial["total"]:
+        missing.append([covered_to, partial["total"]])
+    return missing
+
+
+def summarize(partial: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """
+    Count, mean, standard deviation, min and max of each summary field
+    (min and max are None if no scenario was covered).
+    """
+    summary = {}
+    for field, s in partial["stats"].items():
+        n = s["count"]
+        mean = s["sum"] / n if n else 0.0
+        variance = max(0.0, s["sum_sq"] / n - mean * mean) if n else 0.0
+        summary[field] = {"count": n, "mean": mean, "std": variance ** 0.5, "min": s["min"], "max": s["max"]}
+    return summary
+
+
+def top_results(config: ScenarioConfig, partial: Dict[str, Any], metric: str = "lifetime_interest", return_schedule: bool = False) -> List[Dict[str, Any]]:
+    """
+    The merged top-K by metric as calculate_mortgage results (named, and
+    with schedules if asked for), ready for print_comparison or
+    export_reports. Only these K scenarios are re-simulated.
+    """
+    if partial["config"] != config_fingerprint(config):
+        raise ValueError("Partial result was computed for a different config")
+    space = ScenarioSpace(config)
+    results = []
+    for entry in partial["top"][metric]:
+        scenario = space.compact_at(entry["index"])
+        if return_schedule:
+            result = calculate_mortgage(scenario, return_schedule=True)
+        else:
+            result = {"name": scenario.name, **{field: entry[field] for field in SUMMARY_FIELDS}}
+        result["index"] = entry["index"]
+        results.append(result)
+    return results
+
+
+def write_partial(partial: Dict[str, Any], path: str):
+    with open(path, "w") as f:
+        json.dump(partial, f, allow_nan=False)
+
+
+def read_partial(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def partial_filename(shard: int, num_shards: int) -> str:
+    return f"shard-{shard:04d}-of-{num_shards:04d}.json"
+
+
+def run_sharded(
+    config: ScenarioConfig,
+    num_shards: Optional[int] = None,
+    k: int = DEFAULT_TOP_K,
+    workers: Optional[int] = None,
+    output_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Local stand-in for a cluster: runs every shard in its own worker process
+    and merges the partials. With output_dir, each partial is also written
+    there as it would be by a remote shard.
+    """
+    workers = workers or default_workers()
+    num_shards = num_shards or workers
+    total = len(ScenarioSpace(config))
+    ranges = shard_ranges(total, num_shards)
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    pool = get_pool("process", workers)
+    futures = [pool.submit(run_shard, config, r.start, r.stop, k) for r in ranges]
+    partials = []
+    for shard, future in enumerate(futures):
+        partial = future.result()
+        if output_dir:
+            write_partial(partial, os.path.join(output_dir, partial_filename(shard, num_shards)))
+        partials.append(partial)
+    return merge_partials(partials)
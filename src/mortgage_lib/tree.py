@@ -0,0 +1,59 @@
+import itertools
+from typing import List, Dict, Any, Tuple
+from .models import ScenarioConfig
+from .calculation import MortgageState, run_months
+from .scenarios import ScenarioSpace, rate_options, branch_name
+
+def branch_groups(config: ScenarioConfig) -> List[Tuple[int, List[int]]]:
+    """
+    Groups the config's rate changes by month, in month order.
+    Returns (month, [config indices]) pairs; indices keep config order so the
+    last one in a group is the change that takes effect (as in the dict
+    lookups of calculate_mortgage).
+    """
+    by_month: Dict[int, List[int]] = {}
+    for index, change in enumerate(config.rate_changes):
+        by_month.setdefault(change.month, []).append(index)
+    return sorted(by_month.items())
+
+def simulate_scenario_tree(config: ScenarioConfig, return_schedule: bool = False) -> List[Dict[str, Any]]:
+    """
+    Simulates every branch of the config by walking the branch tree once.
+    The loan state is checkpointed at each branch month and every option
+    resumes from that checkpoint, so shared months are only simulated once.
+    Returns the same results, in the same order, as running
+    calculate_mortgage over expand_scenarios(config).
+    """
+    options = rate_options(config)
+    groups = branch_groups(config)
+    overpayments_map = {item.month: item.amount for item in config.overpayments}
+
+    # Leaves are stored at their ScenarioSpace index
+    space = ScenarioSpace(config)
+    strides = space.strides
+    results: List[Dict[str, Any]] = [None] * len(space)
+    choices = [0] * len(options)
+
+    def descend(state: MortgageState, group_index: int):
+        if group_index == len(groups):
+            index = sum(c * s for c, s in zip(choices, strides))
+            results[index] = state.result(branch_name(config, choices))
+            return
+
+        month, members = groups[group_index]
+        next_month = groups[group_index + 1][0] if group_index + 1 < len(groups) else None
+        combos = list(itertools.product(*(range(len(options[m])) for m in members)))
+
+        for n, combo in enumerate(combos):
+            # The last option can take over the checkpoint itself
+            branch = state if n == len(combos) - 1 else state.copy()
+            for member, choice in zip(members, combo):
+                choices[member] = choice
+            effective_rate = options[members[-1]][combo[-1]]
+            run_months(branch, {month: effective_rate}, overpayments_map, stop_month=next_month)
+            descend(branch, group_index + 1)
+
+    root = MortgageState(config.base_loan, config.analysis_settings, return_schedule=return_schedule)
+    run_months(root, {}, overpayments_map, stop_month=groups[0][0] if groups else None)
+    descend(root, 0)
+    return results
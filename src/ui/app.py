@@ -2,16 +2,36 @@ import streamlit as st
 import pandas as pd
 import sys
 import os
+from typing import List
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
 
 from mortgage_lib.models import ScenarioConfig, LoanDetails, AnalysisSettings, RateChange, Overpayment
-from mortgage_lib.scenarios import expand_scenarios
-from mortgage_lib.calculation import calculate_mortgage
+from mortgage_lib.scenarios import ScenarioSpace
+from mortgage_lib.compact import CompactScenario
+from mortgage_lib.executors import run_scenarios, EXECUTOR_KINDS, default_executor, default_workers
+from mortgage_lib.incremental import IncrementalSimulator
+from mortgage_lib.charts import chart_data, long_format, DEFAULT_MAX_POINTS
 
 st.set_page_config(page_title="Mortgage Calculator", layout="wide")
 
+@st.cache_data(max_entries=32)
+def expand_config(config_json: str) -> List[CompactScenario]:
+    """
+    Expanded scenarios of a config (in the engine's compact form), cached on its JSON.
+    """
+    return list(ScenarioSpace(ScenarioConfig.model_validate_json(config_json)).iter_compact())
+
+def get_simulator() -> IncrementalSimulator:
+    """
+    The session's simulator: it keeps each scenario's checkpoints so a
+    tweaked input only re-simulates from the first month it affects.
+    """
+    if "simulator" not in st.session_state:
+        st.session_state["simulator"] = IncrementalSimulator()
+    return st.session_state["simulator"]
+
 st.title("Mortgage Calculator & Comparison")
 
 with st.sidebar:
@@ -35,6 +55,10 @@ with st.sidebar:
     overpayment_amount = st.number_input("Overpayment (Generic)", value=0)
     overpayment_month = st.number_input("Month for Overpayment", value=1)
 
+    st.header("Execution")
+    executor = st.selectbox("Executor", EXECUTOR_KINDS, index=EXECUTOR_KINDS.index(default_executor()))
+    workers = st.number_input("Workers", value=default_workers(), min_value=1)
+
 
 # Construct config object
 import json
@@ -68,48 +92,61 @@ else:
         overpayments=overpayments
     )
 
-if st.button("Calculate"):
-    if config:
-        scenarios = expand_scenarios(config)
-        results = []
-        for s in scenarios:
-            results.append(calculate_mortgage(s, return_schedule=True))
-            
-        # Display Results
-        
-        # Summary Table
-        summary_data = []
-        for r in results:
-            summary_data.append({
-                "Scenario": r['name'],
-                "Window Interest": r['window_interest'],
-                "Lifetime Interest": r['lifetime_interest'],
-                "Balance @ End Window": r['balance_at_window_end']
-            })
-        
-        st.subheader("Summary")
-        st.dataframe(pd.DataFrame(summary_data))
-        
-        # Charts
+if st.button("Calculate") and config:
+    config_json = config.model_dump_json()
+    if st.session_state.get("results_key") != config_json:
+        scenarios = expand_config(config_json)
+        simulator = get_simulator()
+        if len(scenarios) <= simulator.max_runs:
+            results = simulator.simulate_many(scenarios)
+        else:
+            # Too many to keep checkpoints for; sweep them on the executor
+            results = run_scenarios(scenarios, return_schedule=True, executor=executor, workers=workers)
+        st.session_state["results_key"] = config_json
+        st.session_state["results"] = results
+
+# Results stay in the session, so widgets below survive reruns
+if "results" in st.session_state:
+    results = st.session_state["results"]
+    # Display Results
+    
+    # Summary Table
+    summary_data = []
+    for r in results:
+        summary_data.append({
+            "Scenario": r['name'],
+            "Window Interest": r['window_interest'],
+            "Lifetime Interest": r['lifetime_interest'],
+            "Balance @ End Window": r['balance_at_window_end']
+        })
+    
+    st.subheader("Summary")
+    st.dataframe(pd.DataFrame(summary_data))
+    if "simulator" in st.session_state:
+        stats = st.session_state["simulator"].stats()
+        st.caption(f"Reused {stats['months_reused']:,} simulated months from earlier runs ({stats['hits']} unchanged scenarios).")
+    
+    # Charts: min/median/max across all scenarios plus a few full lines,
+    # each cut down to a fixed number of points
+    names = [r['name'] for r in results]
+    chart_cols = st.columns(3)
+    top_n = chart_cols[0].number_input("Cheapest Scenarios to Plot", value=min(5, len(names)), min_value=0, max_value=len(names))
+    highlighted = chart_cols[1].multiselect("Also Plot", names)
+    max_points = chart_cols[2].number_input("Points per Line", value=DEFAULT_MAX_POINTS, min_value=2, step=50)
+
+    if any('schedule' in r for r in results):
         st.subheader("Balance Over Time")
-        all_dfs = []
-        for r in results:
-            if 'schedule' in r:
-                df = pd.DataFrame(r['schedule'])
-                df['Scenario'] = r['name']
-                all_dfs.append(df)
-        
-        if all_dfs:
-            combined_df = pd.concat(all_dfs)
-            st.line_chart(combined_df, x='Month', y='End Balance', color='Scenario')
-            
-            st.subheader("Interest Paid Over Time")
-            st.line_chart(combined_df, x='Month', y='Cumulative Interest', color='Scenario')
-            
-            # Show Raw Data for first scenario or selected
-            st.subheader("Detailed Schedule")
-            selected_scenario = st.selectbox("Select Scenario", [r['name'] for r in results])
-            if selected_scenario:
-                scenario_res = next(r for r in results if r['name'] == selected_scenario)
-                st.dataframe(pd.DataFrame(scenario_res['schedule']))
+        balance = chart_data(results, "End Balance", top_n=top_n, selected=highlighted, max_points=max_points)
+        st.line_chart(pd.DataFrame(long_format(balance)), x='Month', y='End Balance', color='Series')
+
+        st.subheader("Interest Paid Over Time")
+        interest = chart_data(results, "Cumulative Interest", top_n=top_n, selected=highlighted, max_points=max_points)
+        st.line_chart(pd.DataFrame(long_format(interest)), x='Month', y='Cumulative Interest', color='Series')
+
+        # Show Raw Data for first scenario or selected
+        st.subheader("Detailed Schedule")
+        selected_scenario = st.selectbox("Select Scenario", [r['name'] for r in results])
+        if selected_scenario:
+            scenario_res = next(r for r in results if r['name'] == selected_scenario)
+            st.dataframe(scenario_res['schedule'].to_pandas())
 
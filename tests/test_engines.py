@@ -0,0 +1,84 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mortgage_lib.models import ScenarioConfig
+from mortgage_lib.scenarios import ScenarioSpace
+from mortgage_lib.calculation import calculate_mortgage
+from mortgage_lib.batch import calculate_mortgage_batch
+from mortgage_lib.tree import simulate_scenario_tree
+
+METRICS = ("window_interest", "window_principal", "balance_at_window_end", "lifetime_interest")
+
+NUM_CONFIGS = 100
+
+# The engines sum the same months in a different order, so the unrounded
+# metrics can differ in the last few bits
+TOLERANCE = 1e-6
+
+# lifetime="analytic" promises lifetime interest to within a cent
+ANALYTIC_TOLERANCE = 0.01
+
+
+def random_config(rng: random.Random) -> ScenarioConfig:
+    """
+    A config with branching rate changes and, often, overpayments big enough
+    to pay the loan off early. The window may run past the end of the term.
+    """
+    years = rng.randint(5, 35)
+    months = years * 12
+    window_start = rng.randint(1, months)
+    return ScenarioConfig(
+        analysis_settings={"window_start_month": window_start, "window_end_month": rng.randint(window_start, months + 24)},
+        base_loan={"principal": round(rng.uniform(10000, 1000000), 2), "start_rate": round(rng.uniform(0, 9), 2), "years": years},
+        rate_changes=[
+            {"month": rng.randint(2, months), "new_rate": [round(rng.uniform(0, 9), 2) for _ in range(rng.randint(1, 3))]}
+            for _ in range(rng.randint(0, 3))
+        ],
+        overpayments=[
+            {"month": rng.randint(1, months), "amount": round(rng.uniform(0, rng.choice([5000, 500000])), 2)}
+            for _ in range(rng.randint(0, 3))
+        ],
+    )
+
+
+def configs():
+    rng = random.Random(20240601)
+    return [random_config(rng) for _ in range(NUM_CONFIGS)]
+
+
+def assert_same_metrics(result, expected, tolerance=TOLERANCE, metrics=METRICS):
+    assert result["name"] == expected["name"]
+    for metric in metrics:
+        assert result[metric] == pytest.approx(expected[metric], abs=tolerance), metric
+
+
+@pytest.mark.parametrize("config", configs())
+def test_engines_match_calculate_mortgage(config):
+    scenarios = list(ScenarioSpace(config))
+    expected = [calculate_mortgage(s, return_schedule=True) for s in scenarios]
+    engines = {
+        "batch": calculate_mortgage_batch(scenarios, return_schedule=True),
+        "tree": simulate_scenario_tree(config, return_schedule=True),
+    }
+    for engine, results in engines.items():
+        assert len(results) == len(expected), engine
+        for result, exp in zip(results, expected):
+            assert_same_metrics(result, exp)
+            assert result["schedule"].to_records() == exp["schedule"].to_records(), engine
+
+
+@pytest.mark.parametrize("config", configs())
+def test_analytic_lifetime_matches_full(config):
+    scenarios = list(ScenarioSpace(config))
+    expected = [calculate_mortgage(s) for s in scenarios]
+    for results in ([calculate_mortgage(s, lifetime="analytic") for s in scenarios],
+                    calculate_mortgage_batch(scenarios, lifetime="analytic")):
+        assert len(results) == len(expected)
+        for result, exp in zip(results, expected):
+            assert_same_metrics(result, exp, metrics=METRICS[:3])
+            assert_same_metrics(result, exp, ANALYTIC_TOLERANCE, metrics=METRICS[3:])
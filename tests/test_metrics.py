@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mortgage_lib.metrics import Metrics, sample_value
+
+
+def test_large_counter_is_exact():
+    metrics = Metrics(enabled=True)
+    metrics.inc("months_simulated", 3_612_345)
+    metrics.inc("months_simulated", 1)
+    text = metrics.render_prometheus({"cache_bytes": 268_435_456, "load": 0.25})
+    assert "mortgage_months_simulated_total 3612346\n" in text
+    assert "mortgage_cache_bytes 268435456\n" in text
+    assert "mortgage_load 0.25\n" in text
+
+
+def test_sample_value():
+    assert sample_value(0) == "0"
+    assert sample_value(12.0) == "12"
+    assert sample_value(2 ** 53) == "9007199254740992"
+    assert sample_value(1234567.125) == "1234567.125"
@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mortgage_lib.models import ScenarioConfig
+from mortgage_lib.scenarios import ScenarioSpace
+from mortgage_lib.batch import calculate_mortgage_batch
+from mortgage_lib.reports import differing_months
+
+# differing_months over 10k 25-year schedules takes well under 0.1s on a
+# laptop; the outer-merge version it replaced took minutes
+TIME_LIMIT_SECONDS = 2.0
+
+
+def outer_merge_differing_months(schedules):
+    """
+    The original export_reports logic: outer-merge every schedule's rate
+    column on Month and compare the row-wise min and max.
+    """
+    merged = None
+    for name, schedule in schedules.items():
+        df = schedule.to_pandas()
+        if df.empty:
+            continue
+        temp = df[['Month', 'Rate (%)']].copy()
+        temp.columns = ['Month', f'Rate_{name}']
+        merged = temp if merged is None else pd.merge(merged, temp, on='Month', how='outer')
+    if merged is None:
+        return None
+    rate_cols = [c for c in merged.columns if c.startswith('Rate_')]
+    diff_months = merged[merged[rate_cols].max(axis=1) != merged[rate_cols].min(axis=1)]['Month'].tolist()
+    if not diff_months:
+        return None
+    return min(diff_months), max(diff_months)
+
+
+def simulate(config: ScenarioConfig):
+    space = ScenarioSpace(config)
+    results = calculate_mortgage_batch(list(space.iter_compact()), return_schedule=True)
+    return {r['name']: r['schedule'] for r in results}
+
+
+def test_matches_outer_merge():
+    # An overpayment pays one branch off early, so the schedules differ in length
+    config = ScenarioConfig(
+        base_loan={"principal": 200000, "start_rate": 4.0, "years": 20},
+        rate_changes=[
+            {"month": 13, "new_rate": [3.5, 4.0, 4.5]},
+            {"month": 61, "new_rate": [3.0, 5.0]},
+        ],
+        overpayments=[{"month": 100, "amount": 120000}],
+    )
+    schedules = simulate(config)
+    assert len({len(s) for s in schedules.values()}) > 1
+    assert differing_months(schedules.values()) == outer_merge_differing_months(schedules)
+
+
+def test_no_differences():
+    config = ScenarioConfig(base_loan={"principal": 200000, "start_rate": 4.0, "years": 20},
+                            rate_changes=[{"month": 13, "new_rate": [3.5, 3.5]}])
+    schedules = simulate(config)
+    assert differing_months(schedules.values()) is None
+    assert outer_merge_differing_months(schedules) is None
+
+
+def test_10k_scenarios_time():
+    config = ScenarioConfig(
+        base_loan={"principal": 300000, "start_rate": 4.0, "years": 25},
+        rate_changes=[{"month": m, "new_rate": [3.0 + 0.1 * i for i in range(10)]} for m in (13, 49, 85, 121)],
+    )
+    schedules = list(simulate(config).values())
+    assert len(schedules) == 10000
+
+    start = time.perf_counter()
+    diff_range = differing_months(schedules)
+    elapsed = time.perf_counter() - start
+
+    assert diff_range == (13, 300)
+    assert elapsed < TIME_LIMIT_SECONDS